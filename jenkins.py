@@ -1,12 +1,25 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8; -*-
 
+import re
+import sys
+import copy
 import time
+import codecs
+import hashlib
+import random
+import threading
 import requests
 
-from requests import HTTPError
+from collections import namedtuple, OrderedDict
+from multiprocessing.pool import ThreadPool
+from email.utils import parsedate_tz, mktime_tz
+
+from requests import HTTPError, ConnectionError, Timeout, RequestException
 from requests.compat import quote, json
 from requests.auth import HTTPBasicAuth
+from requests.adapters import HTTPAdapter
+from xml.etree import ElementTree
 
 
 #-----------------------------------------------------------------------------
@@ -17,7 +30,22 @@ __all__ = (
     'JenkinsError',
     'Build',
     'View',
-    'Node'
+    'Node',
+    'QueueItem',
+    'JobSummary',
+    'ViewIndex',
+    'Batch',
+    'BatchResult',
+    'ResponseCache',
+    'InfoCache',
+    'ConfigCache',
+    'RetryPolicy',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'RateLimit',
+    'RequestMetrics',
+    'prometheus_text',
+    'config_digest',
 )
 
 __version__ = '0.5.6'
@@ -27,6 +55,12 @@ __version__ = '0.5.6'
 class _JenkinsBase(object):
     '''Base class for Jenkins objects.'''
 
+    # The smallest tree projection that is sufficient to check existence.
+    _exists_tree = 'name'
+
+    # Cached documents that embed the state of objects of this type.
+    _listings = ('api/json', 'view/')
+
     @property
     def baseurl(self):
         raise NotImplementedError()
@@ -34,33 +68,49 @@ class _JenkinsBase(object):
     def url(self, path):
         return '%s/%s' % (self.baseurl, path)
 
+    def get_info(self, tree=None, depth=0, cached=True):
+        '''
+        Get information about this object, optionally restricted to the
+        fields selected by a ``tree`` projection (e.g. ``'builds[number]'``).
+        '''
+        url = self.url('api/json?depth=%d' % depth)
+        err = '%s does not exist' % str(self)
+        return self.server.json(url, errmsg=err, tree=tree, cached=cached)
+
+    def invalidate(self):
+        '''Drop cached information about this object (see :class:`InfoCache`).'''
+        self.server.invalidate(self.baseurl + '/', *self._listings)
+
     @property
     def info(self):
-        url = self.url('api/json?depth=0')
-        err = '%s does not exist' % str(self)
-        return self.server.json(url, errmsg=err)
+        return self.get_info()
 
     @property
     def exists(self):
         '''Check if object exists.'''
         try:
-            self.info
+            self.get_info(tree=self._exists_tree)
             return True
         except HTTPError as e:
             if e.response.status_code == 404:
                 return False
             raise
+        except CircuitOpenError:
+            raise
         except JenkinsError:
             return False
 
     @property
     def config(self):
+        return self._get_config().text
+
+    def _get_config(self):
         url = self.url('config.xml')
         res = self.server.get(url)
         if res.status_code != 200 or not res.headers.get('content-type', '').startswith('application/xml'):
             msg = 'fetching configuration for item "%s" did not return an xml document'
             raise JenkinsError(msg % self.name)
-        return res.text
+        return res
 
     @config.setter
     def config(self, newconfig):
@@ -68,10 +118,17 @@ class _JenkinsBase(object):
 
     @property
     def config_etree(self):
-        # The cost of `'lxml' in sys.modules` is negligible and is
-        # preferable to having a hard dependency on lxml.
-        from lxml import etree
-        return etree.fromstring(self.config.encode('utf8'))
+        return self._config_document()
+
+    def _config_document(self, extract=None):
+        '''
+        Get the parsed config.xml or, if given, ``extract(document)`` - from
+        the :class:`ConfigCache` if the server has one.
+        '''
+        if self.server.config_cache is not None:
+            return self.server.config_cache.get(self.url('config.xml'), self._get_config, extract)
+        document = _parse_config(self._get_config())
+        return extract(document) if extract else document
 
     @config_etree.setter
     def config_etree(self, newconfig_etree):
@@ -80,19 +137,52 @@ class _JenkinsBase(object):
         from lxml import etree
         self.reconfigure(etree.tostring(newconfig_etree))
 
-    def reconfigure(self, newconfig):
+    def reconfigure(self, newconfig, optimistic=None):
         '''Update the config.xml of an existing item.'''
-        self._not_exist_raise()
-
         url = self.url('config.xml')
         headers = {'Content-Type': 'text/xml'}
         params = {'name': self.name}
-        return self.server.post(url, data=newconfig, params=params, headers=headers)
+        return self._post_existing(url, optimistic, data=newconfig, params=params, headers=headers,
+                                   idempotent=True)
+
+    def reconfigure_if_changed(self, newconfig):
+        '''
+        Update the config.xml of an existing item, unless it is equivalent to
+        the current one (see :func:`config_digest`). Returns True if the new
+        configuration was posted.
+        '''
+        if config_digest(self.config) == config_digest(newconfig):
+            return False
+        # The config has just been fetched - no need to check for existence.
+        self.reconfigure(newconfig, optimistic=True)
+        return True
 
     def _not_exist_raise(self):
         if not self.exists:
             raise JenkinsError('%s does not exist' % str(self))
 
+    def _is_optimistic(self, optimistic):
+        return self.server.optimistic if optimistic is None else optimistic
+
+    def _post_existing(self, url, optimistic=None, **kw):
+        '''
+        POST to an url of an object that must exist. The existence check is
+        skipped in optimistic mode - a 404 response is reported instead.
+        '''
+        if not self._is_optimistic(optimistic):
+            self._not_exist_raise()
+            try:
+                return self.server.post(url, **kw)
+            finally:
+                self.invalidate()
+
+        res = self.server.post(url, throw=False, **kw)
+        self.invalidate()
+        if res.status_code == 404:
+            raise JenkinsError('%s does not exist' % str(self))
+        res.raise_for_status()
+        return res
+
 
 #-----------------------------------------------------------------------------
 class Job(_JenkinsBase):
@@ -122,33 +212,65 @@ class Job(_JenkinsBase):
 
     @property
     def baseurl(self):
-        return 'job/%s' % quote(self.name)
+        # Jobs in folders have full names like 'folder/job'.
+        return '/'.join('job/%s' % quote(i, safe='') for i in self.name.split('/'))
+
+    @property
+    def folder(self):
+        '''Full name of the folder that contains the job ('' for top-level jobs).'''
+        return self.name.rpartition('/')[0]
 
-    def delete(self):
+    @property
+    def basename(self):
+        '''Name of the job within its folder.'''
+        return self.name.rpartition('/')[2]
+
+    def invalidate(self):
+        '''Drop cached information about this job and the folder that contains it.'''
+        listings = self._listings
+        if self.folder:
+            folder = Job(self.folder, self.server)
+            listings += (folder.url('api/json'), folder.url('view/'))
+        self.server.invalidate(self.baseurl + '/', *listings)
+
+    def _create_url(self):
+        '''Url that creates this job in its folder.'''
+        folder = self.folder
+        return Job(folder, self.server).url('createItem') if folder else 'createItem'
+
+    def _copy_params(self, source):
+        # A source in another folder must be referenced by its absolute name.
+        ref = '/' + source.name if self.folder or source.folder else source.name
+        return {'name': self.basename, 'mode': 'copy', 'from': ref}
+
+    def delete(self, optimistic=None):
         '''Permanently remove job.'''
-        self._not_exist_raise()
         url = self.url('doDelete')
+        if self._is_optimistic(optimistic):
+            return self._post_existing(url, optimistic=True)
+
+        self._not_exist_raise()
         res = self.server.post(url, throw=False)
+        self.invalidate()
         if self.exists:
             raise JenkinsError('delete of job "%s" failed' % self.name)
         return res
 
-    def enable(self):
+    def enable(self, optimistic=None):
         '''Enable job.'''
-        self._not_exist_raise()
         url = self.url('enable')
-        return self.server.post(url)
+        return self._post_existing(url, optimistic, idempotent=True)
 
-    def disable(self):
+    def disable(self, optimistic=None):
         '''Disable job.'''
-        self._not_exist_raise()
         url = self.url('disable')
-        return self.server.post(url)
-
-    def build(self, parameters=None, token=None):
-        '''Trigger a build.'''
-        self._not_exist_raise()
+        return self._post_existing(url, optimistic, idempotent=True)
 
+    def build(self, parameters=None, token=None, optimistic=None):
+        '''
+        Trigger a build. Returns the :class:`QueueItem` of the build request
+        (or None if Jenkins did not report it).
+        '''
         params = {}
         if token:
             params['token'] = token
@@ -159,19 +281,20 @@ class Job(_JenkinsBase):
         else:
             url = self.url('build')
 
-        return self.server.post(url, params=params)
+        res = self._post_existing(url, optimistic, params=params)
+        return QueueItem.from_response(self, res)
 
     @property
     def enabled(self):
-        return not '<disabled>true</disabled>' in self.config
+        return _job_enabled(self.get_info(tree=_enabled_tree))
 
     @property
     def builds(self):
-        return [Build(self, i['number']) for i in self.info['builds']]
+        return [Build(self, i['number']) for i in self.get_info(tree='builds[number]')['builds']]
 
     def __last_build_helper(self, path):
         url = self.url(path + '/api/json')
-        res = self.server.json(url)
+        res = self.server.json(url, tree='number', cached=True)
         return Build(self, res['number'])
 
     @property
@@ -186,21 +309,56 @@ class Job(_JenkinsBase):
     def last_successful_build(self):
         return self.__last_build_helper('lastSuccessfulBuild')
 
+    def build_pointers(self, fields=None):
+        '''
+        Get the last, last stable, last successful and last failed builds
+        with a single request. Builds that do not exist are ``None``.
+
+        :param fields: build fields to fetch as well - values become ``(build, info)`` pairs, ``iterable``
+        :returns: ``dict`` with keys ``last_build``, ``last_stable_build``, ...
+        '''
+        info = self.get_info(tree=_pointers_tree(fields))
+        return _pointers(self, info, fields, Build)
+
     @property
     def buildnumbers(self):
-        return [i['number'] for i in self.info['builds']]
+        return [i['number'] for i in self.get_info(tree='builds[number]')['builds']]
+
+    def iter_builds(self, start=0, page_size=100, fields=None):
+        '''
+        Lazily iterate over all builds of the job, newest first. Builds are
+        requested ``page_size`` at a time, so unlike :attr:`builds` this is
+        not limited to the most recent builds.
+
+        :param start: index of the first build to return, ``int``
+        :param page_size: number of builds to fetch per request, ``int``
+        :param fields: build fields to fetch as well - ``(build, info)`` pairs are yielded, ``iterable``
+        '''
+        tree = ','.join(['number'] + list(fields or []))
+        while True:
+            end = start + page_size
+            info = self.get_info(tree='allBuilds[%s]{%d,%d}' % (tree, start, end))
+            page = info.get('allBuilds') or []
+            for item in page:
+                build = Build(self, item['number'])
+                yield (build, item) if fields else build
+
+            if len(page) < page_size:
+                break
+            start = end
 
     @classmethod
-    def create(cls, name, configxml, server):
+    def create(cls, name, configxml, server, optimistic=None):
         '''Create a new Jenkins job.'''
 
         job = cls(name, server)
-        if job.exists:
+        if not job._is_optimistic(optimistic) and job.exists:
             raise JenkinsError('job "%s" already exists' % name)
 
         headers = {'Content-Type': 'text/xml'}
-        params = {'name': name}
-        res = server.post('createItem', data=configxml, params=params, headers=headers, throw=False)
+        params = {'name': job.basename}
+        res = server.post(job._create_url(), data=configxml, params=params, headers=headers, throw=False)
+        job.invalidate()
 
         if not res or res.status_code != 200:
             raise JenkinsError('create "%s" failed' % name)
@@ -211,24 +369,34 @@ class Job(_JenkinsBase):
         #     raise JenkinsError('create "%s" failed' % name, url=res.url)
 
     @classmethod
-    def copy(cls, source, dest, server):
+    def copy(cls, source, dest, server, optimistic=None):
         '''Copy a Jenkins job.'''
 
         job = cls(source, server)
         newjob = cls(dest, server)
 
+        headers = {'Content-Type': 'text/xml'}
+        params = newjob._copy_params(job)
+        msg = 'could not copy job "%s" to "%s"'
+
+        # Jenkins rejects copies from missing jobs and onto existing jobs.
+        if job._is_optimistic(optimistic):
+            res = server.post(newjob._create_url(), params=params, headers=headers, throw=False)
+            newjob.invalidate()
+            if not res:
+                raise JenkinsError(msg % (source, dest))
+            return newjob
+
         if newjob.exists:
             raise JenkinsError('job "%s" already exists' % dest)
 
         if not job.exists:
             raise JenkinsError('job "%s" does not exist' % source)
 
-        headers = {'Content-Type': 'text/xml'}
-        params = {'name': dest, 'mode': 'copy', 'from': source}
-        res = server.post('createItem', params=params, headers=headers)
+        res = server.post(newjob._create_url(), params=params, headers=headers)
+        newjob.invalidate()
 
         if not newjob.exists:
-            msg = 'could not copy job "%s" to "%s"'
             raise JenkinsError(msg % (source, dest))
 
         return newjob
@@ -239,6 +407,7 @@ class View(_JenkinsBase):
     '''Represents a Jenkins view.'''
 
     __slots__ = 'name', 'server'
+    _listings = ('api/json',)
 
     def __init__(self, name, server):
         self.name = name
@@ -266,76 +435,82 @@ class View(_JenkinsBase):
 
     @property
     def jobs(self):
-        return [Job(i['name'], self.server) for i in self.info['jobs']]
+        return [Job(i['name'], self.server) for i in self.get_info(tree='jobs[name]')['jobs']]
 
     @property
     def jobnames(self):
-        return [i['name'] for i in self.info['jobs']]
+        return [i['name'] for i in self.get_info(tree='jobs[name]')['jobs']]
 
-    def delete(self):
+    def delete(self, optimistic=None):
         '''Permanently remove view.'''
-        self._not_exist_raise()
         url = self.url('doDelete')
+        if self._is_optimistic(optimistic):
+            return self._post_existing(url, optimistic=True)
+
+        self._not_exist_raise()
         res = self.server.post(url, throw=False)
+        self.invalidate()
         if self.exists:
             raise JenkinsError('delete of view "%s" failed' % self.name)
         return res
 
-    def remove_job(self, job):
+    def remove_job(self, job, optimistic=None):
         '''Remove job from view.'''
+        msg = 'could not remove job "%s" from view "%s"'
+        self._post_job('removeJobFromView', job, msg, optimistic)
 
-        if not self.exists:
-            raise JenkinsError('view "%s" does not exist' % self.name)
-
-        if not job.exists:
-            raise JenkinsError('job "%s" does not exist' % job.name)
+    def add_job(self, job, optimistic=None):
+        '''Add job to the view.'''
+        msg = 'could not add job "%s" to view "%s"'
+        self._post_job('addJobToView', job, msg, optimistic)
 
-        url = self.url('removeJobFromView')
-        params = {'name': job.name}
-        res = self.server.post(url, params=params)
+    def _post_job(self, path, job, errmsg, optimistic):
+        optimistic = self._is_optimistic(optimistic)
+        if not optimistic:
+            if not self.exists:
+                raise JenkinsError('view "%s" does not exist' % self.name)
 
-        if not res.status_code == 200:
-            msg = 'could not remove job "%s" from view "%s"'
-            raise JenkinsError(msg % (job.name, self.name))
+            if not job.exists:
+                raise JenkinsError('job "%s" does not exist' % job.name)
 
-    def add_job(self, job):
-        '''Add job to the view.'''
+        url = self.url(path)
+        params = {'name': job.name}
+        try:
+            res = self.server.post(url, params=params, throw=not optimistic, idempotent=True)
+        finally:
+            self.invalidate()
+            job.invalidate()
 
-        if not self.exists:
+        # Jenkins responds with 404 for unknown views and 400 for unknown jobs.
+        if optimistic and res.status_code == 404:
             raise JenkinsError('view "%s" does not exist' % self.name)
 
-        if not job.exists:
+        if optimistic and res.status_code == 400:
             raise JenkinsError('job "%s" does not exist' % job.name)
 
-        url = self.url('addJobToView')
-        params = {'name': job.name}
-        res = self.server.post(url, params=params)
-
         if not res.status_code == 200:
-            msg = 'could not add job "%s" to view "%s"'
-            raise JenkinsError(msg % (job.name, self.name))
+            raise JenkinsError(errmsg % (job.name, self.name))
 
     def has_job(self, job):
         '''Check if view contains job.'''
-        config = self.config_etree
-        jobs = config.xpath('jobNames/string/text()')
         job = getattr(job, 'name', job)
-        return job in jobs
+        return job in self._config_document(_view_jobnames)
 
     def __contains__(self, job):
         return self.has_job(job)
 
     @classmethod
-    def create(cls, name, configxml, server):
+    def create(cls, name, configxml, server, optimistic=None):
         '''Create a new Jenkins view.'''
 
         view = cls(name, server)
-        if view.exists:
+        if not view._is_optimistic(optimistic) and view.exists:
             raise JenkinsError('view "%s" already exists' % name)
 
         headers = {'Content-Type': 'text/xml'}
         params = {'name': name}
         res = server.post('createView', data=configxml, params=params, headers=headers, throw=False)
+        view.invalidate()
 
         if not res or res.status_code != 200:
             raise JenkinsError('create "%s" failed' % name)
@@ -354,6 +529,8 @@ class Node(_JenkinsBase):
     '''Represents a Jenkins node.'''
 
     __slots__ = 'name', 'server'
+    _exists_tree = 'displayName'
+    _listings = ('computer/',)
 
     def __init__(self, name, server):
         self.name = name
@@ -386,7 +563,8 @@ class Node(_JenkinsBase):
                labels=None,
                exclusive=False,
                launcher=NodeLaunchMethod.COMMAND,
-               launcher_params={}):
+               launcher_params={},
+               optimistic=None):
         '''
         :param name: name of node to create, ``str``
         :param remotefs: Remote root directory, ``str``
@@ -396,9 +574,10 @@ class Node(_JenkinsBase):
         :param exclusive: Use this node for tied jobs only, ``bool``
         :param launcher: Slave launch method, ``NodeLaunchMethod|str``
         :param launcher_params: Additional launcher parameters, ``dict``
+        :param optimistic: Skip the check for an existing node, ``bool``
         '''
         node = cls(name, server)
-        if node.exists:
+        if not node._is_optimistic(optimistic) and node.exists:
             raise JenkinsError('node "%s" already exists' % name)
 
         mode = 'EXCLUSIVE' if exclusive else 'NORMAL'
@@ -430,6 +609,7 @@ class Node(_JenkinsBase):
         }
 
         res = server.post('computer/doCreateItem', params=params, throw=False)
+        node.invalidate()
 
         if not res or res.status_code != 200:
             print(res.text)
@@ -437,16 +617,20 @@ class Node(_JenkinsBase):
         else:
             res.raise_for_status()
 
-    def delete(self):
+    def delete(self, optimistic=None):
         '''Permanently remove node.'''
-        self._not_exist_raise()
         url = self.url('doDelete')
+        if self._is_optimistic(optimistic):
+            return self._post_existing(url, optimistic=True)
+
+        self._not_exist_raise()
         res = self.server.post(url, throw=False)
+        self.invalidate()
         if self.exists:
             raise JenkinsError('delete of node "%s" failed' % self.name)
         return res
 
-    def reconfigure(self, newconfig):
+    def reconfigure(self, newconfig, optimistic=None):
         raise NotImplementedError
 
 
@@ -455,6 +639,7 @@ class Build(_JenkinsBase):
     '''Represents a Jenkins build.'''
 
     __slots__ = 'job', 'number', 'server'
+    _exists_tree = 'number'
 
     def __init__(self, job, number):
         self.job = job
@@ -477,41 +662,1121 @@ class Build(_JenkinsBase):
 
     @property
     def building(self):
-        return self.info['building']
+        return self.get_info(tree='building')['building']
 
     def __repr__(self):
         cls = self.__class__.__name__
         return '%s(%r, %r)' % (cls, self.job, self.number)
 
+    def invalidate(self):
+        # The state of a build is also part of the information about its job.
+        self.job.invalidate()
+
     def stop(self):
         url = self.url('stop')
-        return self.server.post(url)
+        try:
+            return self.server.post(url)
+        finally:
+            self.invalidate()
+
+    def wait(self, tick=1, timeout=None, max_tick=30, backoff=1.5, jitter=0.1):
+        '''
+        Wait for build to complete and return its result (or None if the
+        build is still running after ``timeout`` seconds).
 
-    def wait(self, tick=1, timeout=None):
-        '''Wait for build to complete.'''
-        start = time.time()
-        while self.building:
+        Polls are spaced according to the estimated remaining time of the
+        build. Once a build overruns its estimate, the interval grows from
+        ``tick`` to ``max_tick`` by a factor of ``backoff``.
+        '''
+        schedule = _PollSchedule(tick, timeout, max_tick, backoff, jitter)
+        while True:
+            info = self.get_info(tree=_PollSchedule.tree, cached=False)
+            if not info['building']:
+                return info['result']
+
+            delay = schedule.next(info)
+            if delay is None:
+                return None
+            time.sleep(delay)
+
+    def iter_console(self, follow=True, start=0, tick=1, encoding='utf-8', chunk_size=65536):
+        '''
+        Iterate over the lines of the console log. Each request fetches only
+        the part of the log that has not been seen yet and the response is
+        streamed, so logs of any size can be processed in constant memory.
+
+        :param follow: keep polling for new output until the build completes, ``bool``
+        :param start: byte offset in the log to start from, ``int``
+        :param tick: seconds to wait between polls when following, ``float``
+        '''
+        url = self.url('logText/progressiveText')
+        decoder = _LineDecoder(encoding)
+        while True:
+            res = self.server.get(url, params={'start': start}, stream=True)
+            try:
+                for chunk in res.iter_content(chunk_size):
+                    for line in decoder.feed(chunk):
+                        yield line
+                start = int(res.headers.get('X-Text-Size', start))
+                more = res.headers.get('X-More-Data', '').lower() == 'true'
+            finally:
+                res.close()
+
+            if not (follow and more):
+                break
             time.sleep(tick)
-            if timeout and (time.time() - start) > timeout:
+
+        tail = decoder.flush()
+        if tail:
+            yield tail
+
+
+#-----------------------------------------------------------------------------
+class QueueItem(_JenkinsBase):
+    '''Represents a build request in the Jenkins queue.'''
+
+    __slots__ = 'job', 'id', 'server'
+    _exists_tree = 'id'
+    _listings = ()
+    _build_factory = Build
+
+    # The queue item fields that are needed to find the started build.
+    tree = 'cancelled,executable[number]'
+
+    def __init__(self, job, id):
+        self.job = job
+        self.id = id
+        self.server = self.job.server
+
+    def __hash__(self):
+        key = (self.job, self.id, self.server, self.__class__)
+        return hash(key)
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) \
+               and self.job == other.job \
+               and self.id == other.id \
+               and self.server == other.server
+
+    def __repr__(self):
+        cls = self.__class__.__name__
+        return '%s(%r, %r)' % (cls, self.job, self.id)
+
+    @property
+    def baseurl(self):
+        return 'queue/item/%d' % self.id
+
+    @classmethod
+    def from_response(cls, job, res):
+        '''Get the queue item from the Location header of a build request.'''
+        match = re.search(r'/queue/item/(\d+)/?$', res.headers.get('Location', ''))
+        return cls(job, int(match.group(1))) if match else None
+
+    def _started(self, info):
+        if info.get('cancelled'):
+            raise JenkinsError('%r was cancelled' % self)
+        executable = info.get('executable')
+        return self._build_factory(self.job, executable['number']) if executable else None
+
+    @property
+    def build(self):
+        '''The build started by this item or None if the item is still waiting.'''
+        return self._started(self.get_info(tree=self.tree, cached=False))
+
+    def wait_until_started(self, tick=1, timeout=None, max_tick=30, backoff=1.5, jitter=0.1):
+        '''
+        Wait for the item to leave the queue and return the build that it
+        started (or None if it is still waiting after ``timeout`` seconds).
+        '''
+        schedule = _PollSchedule(tick, timeout, max_tick, backoff, jitter)
+        while True:
+            info = self.get_info(tree=self.tree, cached=False)
+            build = self._started(info)
+            if build is not None:
+                return build
+
+            delay = schedule.next(info)
+            if delay is None:
+                return None
+            time.sleep(delay)
+
+    def cancel(self):
+        '''Remove the item from the queue.'''
+        return self.server.post('queue/cancelItem', params={'id': self.id})
+
+
+class _LineDecoder(object):
+    '''Incrementally decode chunks of bytes into complete lines of text.'''
+
+    def __init__(self, encoding='utf-8'):
+        self.decoder = codecs.getincrementaldecoder(encoding)('replace')
+        self.pending = ''
+
+    def feed(self, data):
+        lines = (self.pending + self.decoder.decode(data)).split('\n')
+        self.pending = lines.pop()
+        return [line.rstrip('\r') for line in lines]
+
+    def flush(self):
+        tail = self.pending + self.decoder.decode(b'', final=True)
+        self.pending = ''
+        return tail.rstrip('\r')
+
+
+class _JsonArrayReader(object):
+    '''
+    Incrementally parse a json document from an iterator of text chunks and
+    yield the elements of one of its top-level arrays. Only the element that
+    is being decoded is kept in memory - other values are skipped over and
+    the rest of the document is not read once the array has ended.
+    '''
+
+    whitespace = re.compile(r'[ \t\n\r]*')
+    scalar_end = re.compile(r'[,\]}\s]')
+    special = re.compile(r'["\[\]{}]')
+    string_special = re.compile(r'["\\]')
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+
+    def _fill(self):
+        # The incremental decoder returns empty strings for partial characters.
+        for chunk in self.chunks:
+            if chunk:
+                self.buf = chunk
+                self.pos = 0
+                return
+        raise JenkinsError('unparsable json response')
+
+    def _peek(self):
+        while True:
+            self.pos = self.whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self._fill()
+
+    def _consume(self, *expected):
+        char = self._peek()
+        if char not in expected:
+            raise JenkinsError('unparsable json response')
+        self.pos += 1
+        return char
+
+    def _scan(self, keep):
+        '''
+        Find the end of the value at the current position and return its text
+        (if ``keep``). The consumed chunks are discarded as the scan goes on.
+        '''
+        parts = []
+        scalar = self._peek() not in '[{"'
+        depth, in_string, escape, i = 0, False, False, self.pos
+
+        while True:
+            buf, n, end = self.buf, len(self.buf), None
+            if scalar:
+                match = self.scalar_end.search(buf, i)
+                end = match and match.start()
+
+            while end is None and i < n:
+                match = (self.string_special if in_string else self.special).search(buf, i)
+                if match is None:
+                    break
+                i, char = match.end(), match.group()
+                if char == '\\':
+                    # Skip the escaped character, which may be in the next chunk.
+                    escape = i == n
+                    i += 1
+                elif char == '"':
+                    in_string = not in_string
+                    if not in_string and depth == 0:
+                        end = i
+                elif char in '[{':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        end = i
+
+            if end is not None:
                 break
+            if keep:
+                parts.append(buf[self.pos:])
+            self._fill()
+            i, escape = (1 if escape else 0), False
+
+        parts.append(self.buf[self.pos:end])
+        self.pos = end
+        return ''.join(parts) if keep else None
+
+    def _value(self):
+        try:
+            return self.decoder.decode(self._scan(keep=True))
+        except ValueError:
+            raise JenkinsError('unparsable json response')
+
+    def items(self, key):
+        self._consume('{')
+        if self._peek() == '}':
+            return
+
+        while True:
+            name = self._value()
+            self._consume(':')
+            if name != key:
+                self._scan(keep=False)
+            else:
+                self._consume('[')
+                if self._peek() == ']':
+                    return
+                while True:
+                    yield self._value()
+                    if self._consume(',', ']') == ']':
+                        return
+
+            if self._consume(',', '}') == '}':
+                return
+
+
+class _PollSchedule(object):
+    '''Decides how long to sleep between polls of a running build.'''
+
+    # The build fields that a schedule needs.
+    tree = 'building,result,timestamp,estimatedDuration'
+
+    def __init__(self, tick=1, timeout=None, max_tick=30, backoff=1.5, jitter=0.1):
+        self.tick = tick
+        self.max_tick = max(tick, max_tick)
+        self.backoff = backoff
+        self.jitter = jitter
+        self.deadline = None if timeout is None else _monotonic() + timeout
+        self.overdue = tick
+
+    def remaining(self, info):
+        '''Estimated number of seconds until the build completes (or None).'''
+        timestamp, estimate = info.get('timestamp'), info.get('estimatedDuration')
+        if not timestamp or not estimate or estimate < 0:
+            return None
+        return (timestamp + estimate) / 1000.0 - time.time()
+
+    def next(self, info):
+        '''Seconds to sleep before the next poll or None if the deadline has passed.'''
+        now = _monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            return None
+
+        remaining = self.remaining(info)
+        if remaining is not None and remaining > self.tick:
+            delay = min(remaining, self.max_tick)
+        else:
+            delay = self.overdue
+            self.overdue = min(self.overdue * self.backoff, self.max_tick)
+
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if self.deadline is not None:
+            delay = min(delay, self.deadline - now)
+        return max(delay, 0)
+
+
+#-----------------------------------------------------------------------------
+_JobSummaryBase = namedtuple('JobSummary', (
+    'name', 'color', 'buildable',
+    'last_build', 'last_result', 'last_timestamp', 'last_duration',
+))
+
+class JobSummary(_JobSummaryBase):
+    '''
+    Compact, read-only record describing a job and its last build. Fields
+    that were not requested from Jenkins are set to ``None``.
+    '''
+
+    __slots__ = ()
+
+    # Map record fields to the job and last build fields they are read from.
+    job_fields = {'name': 'name', 'color': 'color', 'buildable': 'buildable'}
+    build_fields = {
+        'last_build': 'number',
+        'last_result': 'result',
+        'last_timestamp': 'timestamp',
+        'last_duration': 'duration',
+    }
+
+    @classmethod
+    def tree(cls, fields=None):
+        '''Get the ``jobs[...]`` tree projection for the given record fields.'''
+        fields = cls._fields if fields is None else fields
+        unknown = set(fields) - set(cls._fields)
+        if unknown:
+            raise JenkinsError('unknown job summary fields: %s' % ', '.join(sorted(unknown)))
+
+        job = ['name'] + [cls.job_fields[i] for i in fields if i in cls.job_fields and i != 'name']
+        build = [cls.build_fields[i] for i in fields if i in cls.build_fields]
+        if build:
+            job.append('lastBuild[%s]' % ','.join(build))
+        return 'jobs[%s]' % ','.join(job)
+
+    @property
+    def enabled(self):
+        '''Whether the job is enabled (requires the color or buildable field).'''
+        return _job_enabled({'color': self.color, 'buildable': self.buildable})
+
+    @classmethod
+    def from_json(cls, item):
+        last = item.get('lastBuild') or {}
+        return cls(
+            item['name'],
+            _intern(item.get('color')),
+            item.get('buildable'),
+            last.get('number'),
+            _intern(last.get('result')),
+            last.get('timestamp'),
+            last.get('duration'),
+        )
+
+
+#-----------------------------------------------------------------------------
+class ViewIndex(object):
+    '''
+    Index of the jobs in views and of the views that contain jobs, built
+    from a single request (see :meth:`Jenkins.view_index`). The
+    :attr:`jobs` and :attr:`views` dicts map view names to the names of
+    their jobs and job names to the names of their views.
+    '''
+
+    tree = 'views[name,jobs[name]]'
+
+    def __init__(self, jenkins):
+        self.jenkins = jenkins
+        self.jobs = {}
+        self.views = {}
+
+    def __repr__(self):
+        return '%s(%d views, %d jobs)' % (self.__class__.__name__, len(self.jobs), len(self.views))
+
+    def jobs_of(self, view):
+        '''Get the names of the jobs in a view.'''
+        return frozenset(self.jobs.get(getattr(view, 'name', view), ()))
+
+    def views_of(self, job):
+        '''Get the names of the views that contain a job.'''
+        return frozenset(self.views.get(getattr(job, 'name', job), ()))
+
+    def refresh(self, *views):
+        '''
+        Update the index with one request for all views, or with one
+        request for each of the given views. Returns the names of the views
+        that were added, removed or changed.
+        '''
+        if not views:
+            info = self.jenkins.server.json('api/json', 'unable to retrieve info', tree=self.tree)
+            return self._update(info['views'], complete=True)
+
+        views = [self.jenkins.view(getattr(name, 'name', name)) for name in views]
+        return self._update({'name': i.name, 'jobs': self._jobs(i)} for i in views)
+
+    def _jobs(self, view):
+        try:
+            info = view.get_info(tree='jobs[name]', cached=False)
+        except HTTPError as e:
+            if e.response.status_code != 404:
+                raise
+            return None
+        return info['jobs']
+
+    def _update(self, items, complete=False):
+        '''Apply ``{'name': view, 'jobs': [{'name': job}]}`` items (jobs is None for removed views).'''
+        current = dict((i['name'], i['jobs']) for i in items)
+        if complete:
+            current.update((name, None) for name in self.jobs if name not in current)
+
+        changed = set()
+        for view, jobs in current.items():
+            existed = view in self.jobs
+            old = self.jobs.pop(view, frozenset())
+            new = frozenset(i['name'] for i in jobs or ())
+            if jobs is not None:
+                self.jobs[view] = new
+            if new == old and existed == (jobs is not None):
+                continue
+
+            changed.add(view)
+            for job in old - new:
+                self.views[job].discard(view)
+                if not self.views[job]:
+                    del self.views[job]
+            for job in new - old:
+                self.views.setdefault(job, set()).add(view)
+        return changed
+
+
+#-----------------------------------------------------------------------------
+class ResponseCache(object):
+    '''
+    Size-bounded LRU cache of GET responses that carry an ``ETag`` or a
+    ``Last-Modified`` header. Cached responses are always revalidated with
+    a conditional request - the body is reused if Jenkins replies with
+    ``304 Not Modified``.
+    '''
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def stats(self):
+        '''Counters of cache hits, misses and revalidations (conditional requests).'''
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'entries': len(self.entries),
+            'bytes': self.size,
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.revalidations = 0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _key(self, url, params):
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        return url, tuple(params or ())
+
+    def _validators(self, res):
+        validators = {}
+        if res.headers.get('ETag'):
+            validators['If-None-Match'] = res.headers['ETag']
+        if res.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = res.headers['Last-Modified']
+        return validators
+
+    def get(self, send, url, **kw):
+        '''Send a (conditional) GET request with ``send(url, **kw)``.'''
+        key = self._key(url, kw.get('params'))
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.entries[key] = entry
+
+        if entry is not None:
+            kw['headers'] = mergedict(kw.get('headers') or {}, entry[0])
+
+        res = send(url, **kw)
+
+        with self.lock:
+            if entry is not None:
+                self.revalidations += 1
+                if res.status_code == 304:
+                    self.hits += 1
+                    return entry[1]
+
+            self.misses += 1
+            validators = self._validators(res)
+            if res.status_code == 200 and validators:
+                self._store(key, validators, res)
+            elif entry is not None and key in self.entries:
+                self._remove(key)
+        return res
+
+    def _store(self, key, validators, res):
+        size = len(res.content)
+        if size > self.max_bytes:
+            return
+
+        if key in self.entries:
+            self._remove(key)
+
+        self.entries[key] = (validators, res, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        validators, res, size = self.entries.pop(key)
+        self.size -= size
+
+
+#-----------------------------------------------------------------------------
+class InfoCache(object):
+    '''
+    Cache of decoded api/json documents that expire ``ttl`` seconds after they
+    were fetched. Entries are keyed by url (including the tree projection)
+    and are invalidated by url prefix whenever an object is modified through
+    this library. Callers receive copies of the cached documents.
+    '''
+
+    def __init__(self, ttl=5, maxsize=4096):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, fetch):
+        '''Return the cached value for key, calling fetch() if it is missing or expired.'''
+        now = _monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry[0] > now:
+            return copy.deepcopy(entry[1])
+
+        value = fetch()
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (now + self.ttl, copy.deepcopy(value))
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *prefixes):
+        '''Drop entries with urls that start with any of the prefixes (all entries if none given).'''
+        with self.lock:
+            if not prefixes:
+                self.entries.clear()
+                return
+            for key in [key for key in self.entries if key[0].startswith(prefixes)]:
+                del self.entries[key]
+
+
+#-----------------------------------------------------------------------------
+class ConfigCache(object):
+    '''
+    Cache of parsed config.xml documents. Entries are keyed by url and by a
+    validator of the config (its ``ETag`` or the hash of its content) - the
+    config is downloaded again when an entry is older than ``ttl`` seconds,
+    but it is only parsed again if the validator changed. Entries are
+    invalidated like those of the :class:`InfoCache`. Callers receive copies
+    of the cached documents.
+    '''
+
+    def __init__(self, ttl=0, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def stats(self):
+        '''
+        Counters of documents served without a download (hits), downloaded
+        but unchanged (revalidations) and parsed (misses).
+        '''
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'entries': len(self.entries),
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.revalidations = 0
+
+    def get(self, url, fetch, extract=None):
+        '''
+        Return a copy of the parsed document at url or, if given, the value of
+        ``extract(document)``. Extracted values are cached with the document
+        and must not be modified. The ``fetch()`` function returns the config
+        response and is only called if the entry is missing or expired.
+        '''
+        now = _monotonic()
+        with self.lock:
+            entry = self.entries.get(url)
+
+        if entry is not None and entry.expires > now:
+            with self.lock:
+                self.hits += 1
+        else:
+            res = fetch()
+            validator = res.headers.get('ETag') or hashlib.sha1(res.content).hexdigest()
+            if entry is None or entry.validator != validator:
+                entry = _ConfigEntry(validator, now + self.ttl, _parse_config(res))
+                with self.lock:
+                    self.misses += 1
+            else:
+                with self.lock:
+                    entry.expires = now + self.ttl
+                    self.revalidations += 1
+
+            with self.lock:
+                self.entries.pop(url, None)
+                self.entries[url] = entry
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+
+        # Documents are shared between threads - read them under the lock.
+        with self.lock:
+            if extract is None:
+                return copy.deepcopy(entry.document)
+            if extract not in entry.extracted:
+                entry.extracted[extract] = extract(entry.document)
+            return entry.extracted[extract]
+
+    def invalidate(self, *prefixes):
+        '''Drop entries with urls that start with any of the prefixes (all entries if none given).'''
+        with self.lock:
+            if not prefixes:
+                self.entries.clear()
+                return
+            for url in [url for url in self.entries if url.startswith(prefixes)]:
+                del self.entries[url]
+
+
+class _ConfigEntry(object):
+    __slots__ = 'validator', 'expires', 'document', 'extracted'
+
+    def __init__(self, validator, expires, document):
+        self.validator = validator
+        self.expires = expires
+        self.document = document
+        self.extracted = {}
+
+
+#-----------------------------------------------------------------------------
+class RetryPolicy(object):
+    '''
+    Decides which failed requests are retried and how long to wait before
+    retrying them. Requests fail if they cannot connect, time out or get one
+    of the ``statuses`` responses. Only requests with one of ``methods`` are
+    retried, unless the request is marked as idempotent.
+
+    :param total: maximum number of retries, ``int``
+    :param backoff: delay before the first retry (doubled for every next retry), ``float``
+    :param max_backoff: maximum delay between retries - a longer ``Retry-After`` is not waited for, ``float``
+    :param jitter: relative amount of randomness added to delays, ``float``
+    '''
+
+    def __init__(self, total=3, backoff=0.5, max_backoff=30, jitter=0.1,
+                 statuses=(429, 502, 503, 504), methods=('GET', 'HEAD')):
+        self.total = total
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(methods)
+
+    def __repr__(self):
+        cls = self.__class__.__name__
+        return '%s(total=%r, backoff=%r)' % (cls, self.total, self.backoff)
+
+    def retry_after(self, res):
+        '''Number of seconds in the Retry-After header of a response (or None).'''
+        value = res.headers.get('Retry-After') if res is not None else None
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return int(value)
+        date = parsedate_tz(value)
+        return max(0, mktime_tz(date) - time.time()) if date else None
+
+    def delay(self, attempt, res=None):
+        '''Seconds to wait before the next attempt or None if it should not be made.'''
+        if attempt >= self.total:
+            return None
+
+        retry_after = self.retry_after(res)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class CircuitBreaker(object):
+    '''
+    Stops sending requests to a Jenkins instance that appears to be down.
+    After ``threshold`` consecutive failures (connection errors and 5xx
+    responses) the circuit opens and requests fail immediately with
+    :class:`CircuitOpenError`. After ``reset_timeout`` seconds a single
+    trial request is let through - the circuit closes again if it succeeds.
+    '''
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if _monotonic() - self.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def before(self):
+        '''Raise CircuitOpenError if a request may not be sent right now.'''
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if _monotonic() - self.opened_at >= self.reset_timeout and not self.trial:
+                self.trial = True
+                return
+        raise CircuitOpenError('circuit breaker is open after %d consecutive failures' % self.failures)
+
+    def record(self, success):
+        with self.lock:
+            self.trial = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = _monotonic()
+
+
+class RateLimit(object):
+    '''
+    Client-side limits on the requests sent to Jenkins. A token bucket
+    admits ``rate`` requests per second on average with bursts of up to
+    ``burst`` requests and a semaphore keeps at most ``max_in_flight``
+    requests on the wire - streamed responses count until they are closed.
+    A thread holds at most one slot of the semaphore, so that requests made
+    while iterating over a stream do not wait for the stream to be closed.
+    Either limit may be None. A limit can be shared by many threads and by
+    many :class:`Server` objects.
+
+    The time that requests spent waiting for the limit is summarized in
+    :attr:`stats`.
+    '''
+
+    def __init__(self, rate=None, burst=1, max_in_flight=None):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_in_flight = max_in_flight
+        self.semaphore = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self.lock = threading.Lock()
+        self.held = threading.local()
+        self.tokens = self.burst
+        self.updated = _monotonic()
+        self.in_flight = 0
+        self.reset_stats()
+
+    def __repr__(self):
+        cls = self.__class__.__name__
+        return '%s(rate=%r, burst=%r, max_in_flight=%r)' % (cls, self.rate, self.burst, self.max_in_flight)
+
+    def _reserve(self):
+        '''Take a token and return the number of seconds until it is available.'''
+        with self.lock:
+            now = _monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0, -self.tokens / float(self.rate))
+
+    def acquire(self):
+        '''Wait until a request may be sent and return the seconds waited.'''
+        start, blocked = _monotonic(), False
+        if self.rate:
+            delay = self._reserve()
+            if delay:
+                blocked = True
+                time.sleep(delay)
+        held = getattr(self.held, 'count', 0)
+        if self.semaphore is not None and not held and not self.semaphore.acquire(False):
+            blocked = True
+            self.semaphore.acquire()
+        self.held.count = held + 1
+
+        waited = _monotonic() - start if blocked else 0.0
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            if blocked:
+                self.waits += 1
+                self.wait_time += waited
+                self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+        held = getattr(self.held, 'count', 0)
+        if held > 1:
+            self.held.count = held - 1
+            return
+        self.held.count = 0
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+    @property
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'max_wait': self.max_wait,
+                'in_flight': self.in_flight,
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests = self.waits = 0
+            self.wait_time = self.max_wait = 0.0
+
+
+#-----------------------------------------------------------------------------
+class RequestMetrics(object):
+    '''
+    Counters of the requests sent by a :class:`Server`, aggregated by method
+    and endpoint template (e.g. ``GET job/{name}/api/json``). For every
+    endpoint, the number of requests, latency histogram, response bytes,
+    status codes, errors and retries are recorded.
+    '''
+
+    # Upper bounds (in seconds) of the latency histogram buckets.
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+    # Path segments that follow job/, view/ or computer/ but are not names.
+    reserved = frozenset(('api', 'createItem', 'createView', 'doCreateItem'))
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    @classmethod
+    def template(cls, path):
+        '''Replace the object names and numbers in an url path with placeholders.'''
+        parts = path.split('?', 1)[0].strip('/').split('/')
+        for n, part in enumerate(parts):
+            # Names come first - a job may well be called '2024'.
+            if n and parts[n - 1] in ('job', 'view', 'computer') and part not in cls.reserved:
+                parts[n] = '{name}'
+            elif part.isdigit():
+                parts[n] = '{number}'
+        return '/'.join(parts)
+
+    def _endpoint(self, method, path):
+        key = (method, self.template(path))
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            endpoint = self.endpoints[key] = {
+                'count': 0,
+                'errors': 0,
+                'retries': 0,
+                'bytes': 0,
+                'throttle_waits': 0,
+                'throttle_wait_sum': 0.0,
+                'latency_sum': 0.0,
+                'latency_buckets': [0] * len(self.buckets),
+                'statuses': {},
+            }
+        return endpoint
+
+    def observe(self, method, path, status, latency, nbytes):
+        '''Record a request. The status of requests that failed to complete is None.'''
+        with self.lock:
+            endpoint = self._endpoint(method, path)
+            endpoint['count'] += 1
+            endpoint['bytes'] += nbytes
+            endpoint['latency_sum'] += latency
+            for n, bound in enumerate(self.buckets):
+                if latency <= bound:
+                    endpoint['latency_buckets'][n] += 1
+                    break
+            if status is None:
+                endpoint['errors'] += 1
+            else:
+                endpoint['statuses'][status] = endpoint['statuses'].get(status, 0) + 1
+
+    def received(self, method, path, nbytes):
+        '''Record bytes of a streamed response body, as they are read.'''
+        with self.lock:
+            self._endpoint(method, path)['bytes'] += nbytes
+
+    def retry(self, method, path):
+        with self.lock:
+            self._endpoint(method, path)['retries'] += 1
+
+    def throttled(self, method, path, seconds):
+        '''Record the time that a request waited for its :class:`RateLimit`.'''
+        with self.lock:
+            endpoint = self._endpoint(method, path)
+            endpoint['throttle_waits'] += 1
+            endpoint['throttle_wait_sum'] += seconds
+
+    def snapshot(self):
+        '''Get a copy of the counters, keyed by ``(method, endpoint template)``.'''
+        with self.lock:
+            return copy.deepcopy(self.endpoints)
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+
+
+def prometheus_text(metrics, prefix='jenkins_webapi'):
+    '''Render :class:`RequestMetrics` in the Prometheus text exposition format.'''
+    endpoints = sorted(metrics.snapshot().items())
+    lines = []
+
+    def metric(name, kind, help):
+        lines.append('# HELP %s_%s %s' % (prefix, name, help))
+        lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+
+    def labels(method, endpoint, **extra):
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs = [('method', method), ('endpoint', endpoint)] + sorted(extra.items())
+        return '{%s}' % ','.join('%s="%s"' % (k, escape(v)) for k, v in pairs)
+
+    def sample(name, key, value, **extra):
+        value = repr(value) if isinstance(value, float) else '%d' % value
+        lines.append('%s_%s%s %s' % (prefix, name, labels(*key, **extra), value))
+
+    metric('requests_total', 'counter', 'Requests by response status.')
+    for key, data in endpoints:
+        for status, count in sorted(data['statuses'].items()):
+            sample('requests_total', key, count, status=status)
+        if data['errors']:
+            sample('requests_total', key, data['errors'], status='error')
+
+    metric('retries_total', 'counter', 'Retried requests.')
+    for key, data in endpoints:
+        sample('retries_total', key, data['retries'])
+
+    metric('response_bytes_total', 'counter', 'Bytes of response bodies.')
+    for key, data in endpoints:
+        sample('response_bytes_total', key, data['bytes'])
+
+    metric('throttle_wait_seconds_total', 'counter', 'Time spent waiting for rate limits.')
+    for key, data in endpoints:
+        sample('throttle_wait_seconds_total', key, data['throttle_wait_sum'])
+
+    metric('request_duration_seconds', 'histogram', 'Request latency.')
+    for key, data in endpoints:
+        cumulative = 0
+        for bound, count in zip(metrics.buckets, data['latency_buckets']):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            sample('request_duration_seconds_bucket', key, cumulative, le=le)
+        sample('request_duration_seconds_sum', key, data['latency_sum'])
+        sample('request_duration_seconds_count', key, data['count'])
+
+    return '\n'.join(lines) + '\n'
 
 
 #-----------------------------------------------------------------------------
 class Server(object):
-    def __init__(self, url, username=None, password=None, verify=True, cert=None):
+    def __init__(self, url, username=None, password=None, verify=True, cert=None,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True,
+                 optimistic=False, response_cache_size=0, info_cache_ttl=0,
+                 config_cache_size=0, config_cache_ttl=0, retry=None, circuit_breaker=None,
+                 metrics=False, rate_limits=None):
+        '''
+        :param url: base url of the Jenkins instance, ``str``
+        :param username: username for basic authentication, ``str``
+        :param password: password or api token for basic authentication, ``str``
+        :param verify: verify tls certificates or path to a ca bundle, ``bool|str``
+        :param cert: client certificate, ``str|tuple``
+        :param pool_connections: number of per-host connection pools to cache, ``int``
+        :param pool_maxsize: maximum number of connections kept open per host, ``int``
+        :param pool_block: block when no free connections are available, ``bool``
+        :param keep_alive: reuse connections between requests, ``bool``
+        :param optimistic: skip existence checks before mutating requests, ``bool``
+        :param response_cache_size: bytes of revalidated GET responses to cache (0 disables), ``int``
+        :param info_cache_ttl: seconds to cache object information for (0 disables), ``float``
+        :param config_cache_size: number of parsed config.xml documents to cache (0 disables), ``int``
+        :param config_cache_ttl: seconds to use cached configs for without downloading them again, ``float``
+        :param retry: retry policy or maximum number of retries, ``RetryPolicy|int``
+        :param circuit_breaker: circuit breaker shared by all requests, ``CircuitBreaker``
+        :param metrics: record request metrics in :attr:`metrics`, ``bool``
+        :param rate_limits: limits by request class (see :meth:`rate_limit`), ``dict``
+        '''
         self.url = url if url.endswith('/') else url + '/'
         self.auth = HTTPBasicAuth(username, password) if username else None
         self.verify = verify
         self.cert = cert
-        self.crumb_header = None
-
-        # These arguments will be passed in every call to requests.get|post().
+        self.optimistic = optimistic
+        self.response_cache = ResponseCache(response_cache_size) if response_cache_size else None
+        self.info_cache = InfoCache(info_cache_ttl) if info_cache_ttl else None
+        self.config_cache = ConfigCache(config_cache_ttl, config_cache_size) if config_cache_size else None
+        if isinstance(retry, bool):
+            raise TypeError('retry must be a RetryPolicy or a number of retries, not a bool')
+        self.retry = RetryPolicy(retry) if isinstance(retry, int) else retry
+        self.circuit_breaker = circuit_breaker
+        self.metrics = RequestMetrics() if metrics else None
+        self.rate_limits = dict(rate_limits or {})
+
+        # The crumb is fetched on the first POST and is cached together
+        # with the session cookie that it was issued for.
+        self._crumb_lock = threading.Lock()
+        self._crumb_header = _missing
+        self._crumb_cookie = None
+
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.session = self._make_session()
+
+        # These arguments will be passed in every call to session.get|post().
         self.request_kw = {
             'auth': self.auth,
             'cert': cert,
             'verify': verify,
         }
 
+    def _make_session(self):
+        session = requests.Session()
+        self._mount_adapter(session)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def _mount_adapter(self, session):
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+    def resize_pool(self, pool_maxsize):
+        '''
+        Change the maximum number of connections kept open per host. The
+        connections of the previous pool are closed once they are released.
+        '''
+        old = self.session.get_adapter(self.url)
+        self.pool_maxsize = pool_maxsize
+        self._mount_adapter(self.session)
+        old.close()
+
+    def close(self):
+        '''Close all pooled connections.'''
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def __repr__(self):
         cls = self.__class__.__name__
         return '%s(%s)' % (cls, self.url)
@@ -535,27 +1800,197 @@ class Server(object):
     def urljoin(self, *args):
         return '%s%s' % (self.url, '/'.join(args))
 
-    def post(self, url, throw=True, **kw):
+    def _session_cookie(self):
+        cookies = ((c.name, c.value) for c in self.session.cookies if c.name.startswith('JSESSIONID'))
+        return tuple(sorted(cookies))
+
+    def fetch_crumb(self):
+        '''Get crumb (or None if doesn't exist) from the Jenkins.'''
+        url = 'crumbIssuer/api/json'
+        try:
+            return self.json(url, 'unable to retrieve crumb')
+        except HTTPError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+        except CircuitOpenError:
+            raise
+        except JenkinsError:
+            return None
+
+    @property
+    def crumb_header(self):
+        '''Crumb header sent with every POST request (fetched on first use).'''
+        with self._crumb_lock:
+            if self._crumb_header is _missing or self._crumb_cookie != self._session_cookie():
+                crumb = self.fetch_crumb()
+                self._crumb_header = {crumb['crumbRequestField']: crumb['crumb']} if crumb else None
+                self._crumb_cookie = self._session_cookie()
+            return self._crumb_header
+
+    @crumb_header.setter
+    def crumb_header(self, header):
+        with self._crumb_lock:
+            self._crumb_header = header
+            self._crumb_cookie = self._session_cookie()
+
+    def invalidate_crumb(self):
+        '''Discard the cached crumb - it will be fetched again on the next POST.'''
+        with self._crumb_lock:
+            self._crumb_header = _missing
+
+    def _post(self, url, **kw):
         kw = mergedict(self.request_kw, kw)
-        if self.crumb_header is not None:
+        crumb_header = self.crumb_header
+        if crumb_header is not None:
             headers = kw.get('headers', dict())
-            headers = mergedict(headers, self.crumb_header)
+            headers = mergedict(headers, crumb_header)
             kw['headers'] = headers
-        res = requests.post(self.urljoin(url), **kw)
+        return self._request('POST', self.urljoin(url), **kw)
+
+    def post(self, url, throw=True, **kw):
+        res = self._post(url, **kw)
+
+        # The crumb is no longer valid if Jenkins was restarted or if the
+        # session it was issued for has expired. Refresh it and try again.
+        if res.status_code == 403 and 'No valid crumb' in res.text:
+            self.invalidate_crumb()
+            res = self._post(url, **kw)
+
         throw and res.raise_for_status()
         return res
 
-    def get(self, url, throw=True, **kw):
+    def _get(self, url, **kw):
         kw = mergedict(self.request_kw, kw)
-        res = requests.get(self.urljoin(url), **kw)
-        throw and res.raise_for_status()
+        if self.response_cache is None or kw.get('stream'):
+            return self._request('GET', url, **kw)
+        return self.response_cache.get(lambda url, **kw: self._request('GET', url, **kw), url, **kw)
+
+    def _request(self, method, url, idempotent=None, **kw):
+        '''
+        Send a request through the connection pool, retrying it according
+        to the retry policy. Requests that are not idempotent (e.g. POST) are
+        only retried if they are explicitly marked as ``idempotent``.
+        '''
+        retry, breaker, metrics = self.retry, self.circuit_breaker, self.metrics
+        if retry is not None and idempotent is None:
+            idempotent = method in retry.methods
+
+        attempt = 0
+        while True:
+            if breaker is not None:
+                breaker.before()
+
+            if metrics is not None:
+                path = url[len(self.url):] if url.startswith(self.url) else url
+
+            limit = self.rate_limit(method, url) if self.rate_limits else None
+            if limit is not None:
+                waited = limit.acquire()
+                if metrics is not None and waited:
+                    metrics.throttled(method, path, waited)
+
+            if metrics is not None:
+                start = _monotonic()
+
+            try:
+                try:
+                    res = self.session.request(method, url, **kw)
+                except BaseException:
+                    if limit is not None:
+                        limit.release()
+                    raise
+                if limit is not None:
+                    # The body of a streamed response is transferred until it is closed.
+                    if kw.get('stream'):
+                        _release_on_close(res, limit)
+                    else:
+                        limit.release()
+            except (ConnectionError, Timeout):
+                if metrics is not None:
+                    metrics.observe(method, path, None, _monotonic() - start, 0)
+                if breaker is not None:
+                    breaker.record(False)
+                delay = retry.delay(attempt) if retry is not None and idempotent else None
+                if delay is None:
+                    raise
+            except RequestException:
+                # E.g. a broken chunked response - a failure, but not one worth retrying.
+                if metrics is not None:
+                    metrics.observe(method, path, None, _monotonic() - start, 0)
+                if breaker is not None:
+                    breaker.record(False)
+                raise
+            else:
+                if metrics is not None:
+                    if kw.get('stream'):
+                        # The body has not been read yet - count it as it is.
+                        _count_received(res, metrics, method, path)
+                        nbytes = 0
+                    else:
+                        nbytes = len(res.content or b'')
+                    metrics.observe(method, path, res.status_code, _monotonic() - start, nbytes)
+                if breaker is not None:
+                    breaker.record(res.status_code < 500)
+                if retry is None or not idempotent or res.status_code not in retry.statuses:
+                    return res
+                delay = retry.delay(attempt, res)
+                if delay is None:
+                    return res
+                res.close()
+
+            if metrics is not None:
+                metrics.retry(method, path)
+            attempt += 1
+            time.sleep(delay)
+
+    def rate_limit(self, method, url):
+        '''
+        Get the :class:`RateLimit` of a request (or None). The keys of
+        ``rate_limits`` are request classes - an HTTP method (``'POST'``), an
+        endpoint class (``'json'``, ``'console'``, ``'config'`` or ``'other'``),
+        both (``'GET json'``) or ``'*'`` for all requests. The most specific
+        class with a limit applies.
+        '''
+        endpoint = _endpoint_class(url)
+        for key in ('%s %s' % (method, endpoint), method, endpoint, '*'):
+            limit = self.rate_limits.get(key)
+            if limit is not None:
+                return limit
+        return None
+
+    def get(self, url, throw=True, **kw):
+        res = self._get(self.urljoin(url), **kw)
+        try:
+            throw and res.raise_for_status()
+        except HTTPError:
+            res.close()
+            raise
         return res
 
-    def json(self, url, errmsg=None, throw=True, **kw):
+    def invalidate(self, *prefixes):
+        '''Drop cached information for urls that start with any of the prefixes (or all).'''
+        if self.info_cache is not None:
+            self.info_cache.invalidate(*prefixes)
+        if self.config_cache is not None:
+            self.config_cache.invalidate(*prefixes)
+
+    def json(self, url, errmsg=None, throw=True, tree=None, cached=False, **kw):
+        '''
+        Fetch and decode a json document. The ``tree`` argument limits the
+        response to the given fields (e.g. ``'jobs[name,color]'``). With
+        ``cached``, the document may be served from the :class:`InfoCache`.
+        '''
+        if cached and self.info_cache is not None and not kw:
+            def fetch():
+                return self.json(url, errmsg, throw, tree)
+            return self.info_cache.get((url, tree), fetch)
+
         url = self.urljoin(url)
-        kw = mergedict(self.request_kw, kw)
+        if tree:
+            kw['params'] = mergedict(kw.get('params') or {}, {'tree': tree})
         try:
-            res = requests.get(url, **kw)
+            res = self._get(url, **kw)
             throw and res.raise_for_status()
             if not res:
                 raise JenkinsError(errmsg)
@@ -563,15 +1998,109 @@ class Server(object):
         except ValueError:
             raise JenkinsError('unparsable json response')
 
+    def iter_json(self, url, key, errmsg=None, tree=None, chunk_size=65536, **kw):
+        '''
+        Stream a json document and yield the elements of its top-level array
+        ``key`` (e.g. ``'jobs'``) as they arrive. Unlike :meth:`json`, memory
+        use does not grow with the size of the array. Streamed documents are
+        never served from the caches.
+        '''
+        url = self.urljoin(url)
+        if tree:
+            kw['params'] = mergedict(kw.get('params') or {}, {'tree': tree})
+
+        res = self._get(url, stream=True, **kw)
+        try:
+            res.raise_for_status()
+            if not res:
+                raise JenkinsError(errmsg)
+
+            decoder = codecs.getincrementaldecoder(res.encoding or 'utf-8')('replace')
+            chunks = (decoder.decode(chunk) for chunk in res.iter_content(chunk_size))
+            for item in _JsonArrayReader(chunks).items(key):
+                yield item
+        finally:
+            res.close()
+
+
+#-----------------------------------------------------------------------------
+class BatchResult(namedtuple('BatchResult', 'item result error')):
+    '''Outcome of a single operation in a :class:`Batch`.'''
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class Batch(object):
+    '''
+    Run operations on many Jenkins objects concurrently, using a bounded pool
+    of threads that share the connection pool of the :class:`Server`. There
+    are never more workers than pooled connections - create the server with
+    a ``pool_maxsize`` of at least ``max_workers`` to use them all.
+
+    >>> j = Jenkins('http://server:port', pool_maxsize=16)
+    >>> results = j.batch(max_workers=16).map('job_disable', j.jobnames)
+    >>> failed = [r for r in results if not r.ok]
+    '''
+
+    def __init__(self, jenkins, max_workers=8):
+        self.jenkins = jenkins
+        # Workers without a pooled connection would open a new one per request.
+        self.max_workers = min(max_workers, jenkins.server.pool_maxsize)
+
+    def map(self, op, items):
+        '''
+        Apply an operation to every item and collect the results. Failures do
+        not abort the batch - they are reported in :attr:`BatchResult.error`.
+
+        :param op: name of a :class:`Jenkins` method (e.g. ``'job_disable'``) or a callable
+        :param items: arguments for each call; tuples are expanded into positional arguments
+        :returns: list of :class:`BatchResult`, in the order of ``items``
+        '''
+        func = op if callable(op) else getattr(self.jenkins, op)
+
+        def call(item):
+            args = item if isinstance(item, tuple) else (item,)
+            try:
+                return BatchResult(item, func(*args), None)
+            except Exception as error:
+                return BatchResult(item, None, error)
+
+        items = list(items)
+        if not items:
+            return []
+
+        pool = ThreadPool(min(self.max_workers, len(items)))
+        try:
+            return pool.map(call, items, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
 
 #-----------------------------------------------------------------------------
 class Jenkins(object):
-    def __init__(self, url, username=None, password=None, verify=True, cert=None):
-        '''Create handle to Jenkins instance.'''
+    def __init__(self, url, username=None, password=None, verify=True, cert=None, **kw):
+        '''
+        Create handle to Jenkins instance. Additional keyword arguments
+        (e.g. ``pool_maxsize``, ``keep_alive``) are passed to :class:`Server`.
+        '''
 
-        self.server = Server(url, username, password, verify, cert)
+        self.server = Server(url, username, password, verify, cert, **kw)
         self.url = self.server.url
-        self.server.crumb_header = self.crumb_header
+
+    def close(self):
+        '''Close all pooled connections to the Jenkins instance.'''
+        self.server.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def __repr__(self):
         cls = self.__class__.__name__
@@ -583,60 +2112,155 @@ class Jenkins(object):
     def __eq__(self, other):
         return isinstance(other, self.__class__) and self.server == other.server
 
+    def get_info(self, tree=None):
+        '''
+        Get information about this Jenkins instance, optionally restricted
+        to the fields selected by a ``tree`` projection (e.g. ``'jobs[name]'``).
+        '''
+        url = 'api/json'
+        res = self.server.json(url, 'unable to retrieve info', tree=tree, cached=True)
+        return res
+
     @property
     def info(self):
         '''Get information about this Jenkins instance.'''
-        url = 'api/json'
-        res = self.server.json(url, 'unable to retrieve info')
+        return self.get_info()
+
+    def get_computer(self, tree=None):
+        '''Get information about the Jenkins build executors.'''
+        url = 'computer/api/json'
+        res = self.server.json(url, 'unable to retrieve info', tree=tree, cached=True)
         return res
 
+    def invalidate(self):
+        '''Drop all cached information (see :class:`InfoCache`).'''
+        self.server.invalidate()
+
     @property
     def computer(self):
         '''Get information about the Jenkins build executors.'''
-        url = 'computer/api/json'
-        res = self.server.json(url, 'unable to retrieve info')
-        return res
+        return self.get_computer()
 
     @property
     def crumb(self):
         '''Get crumb (or None if doesn't exist) from the Jenkins.'''
-        url = 'crumbIssuer/api/json'
-        try:
-            res = self.server.json(url, 'unable to retrieve info')
-            return res
-        except HTTPError as e:
-            if e.response.status_code == 404:
-                return None
-            raise
-        except JenkinsError:
-            return None
+        return self.server.fetch_crumb()
 
     @property
     def crumb_header(self):
-        crumb = self.crumb
-        if crumb is None:
-            return None
-        return {crumb['crumbRequestField']: crumb['crumb']}
+        return self.server.crumb_header
 
     @property
     def jobs(self):
-        return list(self.xjobs)
+        return [Job(i['name'], self.server) for i in self.get_info(tree='jobs[name]')['jobs']]
 
     @property
     def xjobs(self):
-        return (Job(i['name'], self.server) for i in self.info['jobs'])
+        '''Lazily iterate over the jobs while the job list is being received.'''
+        items = self.server.iter_json('api/json', 'jobs', 'unable to retrieve info', tree='jobs[name]')
+        return (Job(i['name'], self.server) for i in items)
 
     @property
     def jobnames(self):
-        return [i['name'] for i in self.info['jobs']]
+        return [i['name'] for i in self.get_info(tree='jobs[name]')['jobs']]
+
+    def walk_jobs(self, max_depth=None, levels=3):
+        '''
+        Iterate over the jobs in all folders. Every request fetches the
+        contents of ``levels`` nested folder levels through a nested tree
+        projection, so deep hierarchies need only a few requests. Jobs are
+        yielded with their full names (e.g. ``Job('folder/sub/job')``),
+        folders are not yielded.
+
+        :param max_depth: number of folder levels to descend into (None for all), ``int``
+        :param levels: folder levels to fetch per request, ``int``
+        '''
+        pending = [('', 0)]
+        while pending:
+            folder, depth = pending.pop(0)
+            count = levels if max_depth is None else min(levels, max_depth - depth + 1)
+            url = Job(folder, self.server).url('api/json') if folder else 'api/json'
+            info = self.server.json(url, 'unable to retrieve info', tree=_walk_tree(count))
+            for name in _walk_names(info, folder, depth, count, max_depth, pending):
+                yield self.job(name)
+
+    def jobs_build_pointers(self, fields=None):
+        '''Get :meth:`Job.build_pointers` for every job with a single request.'''
+        info = self.get_info(tree='jobs[name,%s]' % _pointers_tree(fields))
+        return dict((i['name'], _pointers(self.job(i['name']), i, fields, self.build)) for i in info['jobs'])
+
+    def jobs_enabled(self):
+        '''Get the enabled state of every job with a single request.'''
+        info = self.get_info(tree='jobs[name,%s]' % _enabled_tree)
+        return dict((i['name'], _job_enabled(i)) for i in info['jobs'])
+
+    def job_summaries(self, fields=None):
+        '''
+        Get a :class:`JobSummary` for every job with a single request.
+
+        :param fields: record fields to fetch (default: all), ``iterable``
+        '''
+        info = self.get_info(tree=JobSummary.tree(fields))
+        return [JobSummary.from_json(i) for i in info['jobs']]
+
+    def xjob_summaries(self, fields=None):
+        '''Like :meth:`job_summaries`, but stream the summaries one job at a time.'''
+        tree = JobSummary.tree(fields)
+        items = self.server.iter_json('api/json', 'jobs', 'unable to retrieve info', tree=tree)
+        return (JobSummary.from_json(i) for i in items)
+
+    def queue_resolve(self, items):
+        '''
+        Get the builds started by many :class:`QueueItem` objects at once. A
+        single queue request finds the items that are still waiting and the
+        builds of the others are found in the build list of their jobs (one
+        request per job). Returns a :class:`BatchResult` for every item, with
+        the :class:`Build` or None (still waiting) as result. Items that were
+        cancelled or cannot be found are reported in :attr:`BatchResult.error`.
+        '''
+        info = self.server.json('queue/api/json', 'unable to retrieve queue', tree='items[id]')
+        waiting = set(i['id'] for i in info['items'])
+
+        started = {}
+        for job in set(i.job for i in items if i.id not in waiting):
+            try:
+                builds = job.get_info(tree='builds[number,queueId]', cached=False)['builds']
+            except Exception:
+                # The items of this job are resolved one by one below.
+                continue
+            for build in builds:
+                started[build.get('queueId')] = build['number']
+
+        res = []
+        for item in items:
+            if item.id in waiting:
+                res.append(BatchResult(item, None, None))
+            elif item.id in started:
+                res.append(BatchResult(item, item._build_factory(item.job, started[item.id]), None))
+            else:
+                # Cancelled or no longer in the build list - ask the item itself.
+                try:
+                    res.append(BatchResult(item, item.build, None))
+                except Exception as error:
+                    res.append(BatchResult(item, None, error))
+        return res
 
     @property
     def views(self):
-        return [View(i['name'], self.server) for i in self.info['views']]
+        return [View(i['name'], self.server) for i in self.get_info(tree='views[name]')['views']]
 
     @property
     def viewnames(self):
-        return [i['name'] for i in self.info['views']]
+        return [i['name'] for i in self.get_info(tree='views[name]')['views']]
+
+    def view_index(self):
+        '''
+        Get a :class:`ViewIndex` of the jobs in all views and of the views
+        of all jobs with a single request.
+        '''
+        index = ViewIndex(self)
+        index.refresh()
+        return index
 
     @property
     def nodes(self):
@@ -645,7 +2269,8 @@ class Jenkins(object):
     @property
     def nodenames(self):
         names = []
-        for name in (comp['displayName'] for comp in self.computer['computer']):
+        computer = self.get_computer(tree='computer[displayName]')
+        for name in (comp['displayName'] for comp in computer['computer']):
             names.append(name if name != 'master' else '(master)')
         return names
 
@@ -664,6 +2289,30 @@ class Jenkins(object):
     def node(self, name):
         return Node(name, self.server)
 
+    def queue_item(self, name, id):
+        job = name if isinstance(name, Job) else self.job(name)
+        return QueueItem(job, id)
+
+    def batch(self, max_workers=8):
+        '''Get a :class:`Batch` that runs operations on this instance concurrently.'''
+        return Batch(self, max_workers)
+
+    def reconfigure_many(self, configs, max_workers=8):
+        '''
+        Reconfigure many jobs, given a ``{name: configxml}`` mapping. The
+        current configurations are fetched concurrently and only those that
+        are not equivalent to the new one (see :func:`config_digest`) are
+        posted. Returns an ``OrderedDict`` of :class:`BatchResult` by job
+        name, with a result of ``'changed'`` or ``'unchanged'``, or the error
+        of a failed job.
+        '''
+        def reconfigure(name):
+            changed = self.job(name).reconfigure_if_changed(configs[name])
+            return 'changed' if changed else 'unchanged'
+
+        results = self.batch(max_workers).map(reconfigure, list(configs))
+        return OrderedDict((i.item, i) for i in results)
+
     #-------------------------------------------------------------------------
     def job_info(self, name):
         return self.job(name).info
@@ -671,14 +2320,14 @@ class Jenkins(object):
     def job_exists(self, name):
         return self.job(name).exists
 
-    def job_delete(self, name):
-        return self.job(name).delete()
+    def job_delete(self, name, optimistic=None):
+        return self.job(name).delete(optimistic)
 
-    def job_enable(self, name):
-        return self.job(name).enable()
+    def job_enable(self, name, optimistic=None):
+        return self.job(name).enable(optimistic)
 
-    def job_disable(self, name):
-        return self.job(name).disable()
+    def job_disable(self, name, optimistic=None):
+        return self.job(name).disable(optimistic)
 
     def job_enabled(self, name):
         return self.job(name).enabled
@@ -686,9 +2335,9 @@ class Jenkins(object):
     def job_config(self, name):
         return self.job(name).config
 
-    def job_reconfigure(self, name, newconfig):
+    def job_reconfigure(self, name, newconfig, optimistic=None):
         job = self.job(name)
-        job.config = newconfig
+        job.reconfigure(newconfig, optimistic)
         return job
 
     def job_config_etree(self, name):
@@ -699,12 +2348,15 @@ class Jenkins(object):
         job.config_etree = newconfig
         return job
 
-    def job_build(self, name, parameters=None, token=None):
-        return self.job(name).build(parameters, token)
+    def job_build(self, name, parameters=None, token=None, optimistic=None):
+        return self.job(name).build(parameters, token, optimistic)
 
     def job_builds(self, name):
         return self.job(name).builds
 
+    def job_iter_builds(self, name, start=0, page_size=100, fields=None):
+        return self.job(name).iter_builds(start, page_size, fields)
+
     def job_last_build(self, name):
         return self.job(name).last_build
 
@@ -714,11 +2366,14 @@ class Jenkins(object):
     def job_last_successful_build(self, name):
         return self.job(name).last_successful_build
 
-    def job_create(self, name, config):
-        return Job.create(name, config, self.server)
+    def job_build_pointers(self, name, fields=None):
+        return self.job(name).build_pointers(fields)
+
+    def job_create(self, name, config, optimistic=None):
+        return Job.create(name, config, self.server, optimistic)
 
-    def job_copy(self, source, dest):
-        return Job.copy(source, dest, self.server)
+    def job_copy(self, source, dest, optimistic=None):
+        return Job.copy(source, dest, self.server, optimistic)
 
     #-------------------------------------------------------------------------
     def build_info(self, job, number):
@@ -731,7 +2386,10 @@ class Jenkins(object):
         return self.build(job, number).stop()
 
     def build_wait(self, job, number, interval=1, timeout=None):
-        return self.build(job, number).wait()
+        return self.build(job, number).wait(interval, timeout)
+
+    def build_iter_console(self, job, number, follow=True):
+        return self.build(job, number).iter_console(follow)
 
     #-------------------------------------------------------------------------
     def view_exists(self, name):
@@ -746,49 +2404,49 @@ class Jenkins(object):
     def view_jobnames(self, name):
         return self.view(name).jobnames
 
-    def view_reconfigure(self, name, newconfig):
+    def view_reconfigure(self, name, newconfig, optimistic=None):
         view = self.view(name)
-        view.config = newconfig
+        view.reconfigure(newconfig, optimistic)
         return view
 
     def view_config_etree(self, name):
         return self.view(name).config_etree
 
-    def view_delete(self, name):
-        return self.view(name).delete()
+    def view_delete(self, name, optimistic=None):
+        return self.view(name).delete(optimistic)
 
     def view_reconfigure_etree(self, name, newconfig):
         view = self.view(name)
         view.config_etree = newconfig
         return view
 
-    def view_add_job(self, name, job_name):
+    def view_add_job(self, name, job_name, optimistic=None):
         job = self.job(job_name)
-        return self.view(name).add_job(job)
+        return self.view(name).add_job(job, optimistic)
 
     def view_has_job(self, name, job_name):
         job = self.job(job_name)
         return self.view(name).has_job(job)
 
-    def view_remove_job(self, name, job_name):
+    def view_remove_job(self, name, job_name, optimistic=None):
         job = self.job(job_name)
-        return self.view(name).remove_job(job)
+        return self.view(name).remove_job(job, optimistic)
 
-    def view_create(self, name, config):
-        return View.create(name, config, self.server)
+    def view_create(self, name, config, optimistic=None):
+        return View.create(name, config, self.server, optimistic)
 
     #-------------------------------------------------------------------------
     def node_exists(self, name):
-        return Node(name, self.server).exists
+        return self.node(name).exists
 
     def node_create(self, name, remotefs, *args, **kw):
         return Node.create(name, remotefs, self.server, *args, **kw)
 
     def node_info(self, name):
-        return Node(name, self.server).info
+        return self.node(name).info
 
-    def node_delete(self, name):
-        return Node(name, self.server).delete()
+    def node_delete(self, name, optimistic=None):
+        return self.node(name).delete(optimistic)
 
     def node_config(self, name):
         return self.node(name).config
@@ -803,10 +2461,13 @@ class Jenkins(object):
     job_reconfigure.__doc__ = Job.reconfigure.__doc__
     job_build.__doc__ = Job.build.__doc__
     job_create.__doc__ = Job.create.__doc__
+    job_iter_builds.__doc__ = Job.iter_builds.__doc__
+    job_build_pointers.__doc__ = Job.build_pointers.__doc__
     job_copy.__doc__ = Job.copy.__doc__
 
     build_stop.__doc__ = Build.stop.__doc__
     build_wait.__doc__ = Build.wait.__doc__
+    build_iter_console.__doc__ = Build.iter_console.__doc__
 
     view_exists.__doc__ = View.exists.__doc__
     view_add_job.__doc__ = View.add_job.__doc__
@@ -821,12 +2482,155 @@ class Jenkins(object):
 
 
 #-----------------------------------------------------------------------------
+# Sentinel for values that have not been fetched yet.
+_missing = object()
+
+# Job fields that tell if a job is disabled - not every job type has them all.
+_enabled_tree = 'disabled,color,buildable'
+
+_monotonic = getattr(time, 'monotonic', time.time)
+
+# Names and json keys of the permalinks that Jenkins maintains for every job.
+_pointer_fields = (
+    ('last_build', 'lastBuild'),
+    ('last_stable_build', 'lastStableBuild'),
+    ('last_successful_build', 'lastSuccessfulBuild'),
+    ('last_failed_build', 'lastFailedBuild'),
+)
+
+_intern_str = getattr(sys, 'intern', None) or intern  # noqa: F821
+
 # Utility functions.
 def mergedict(a, b):
     c = a.copy()
     c.update(b)
     return c
 
+def config_digest(config):
+    '''
+    Hash of the normalized form of an xml configuration. Documents that differ
+    only in their xml declaration, comments, order of attributes or in the
+    whitespace between elements have the same digest.
+    '''
+    if not isinstance(config, bytes):
+        config = config.encode('utf8')
+    digest = hashlib.sha256()
+
+    def update(*parts):
+        for part in parts:
+            digest.update(part.encode('utf8'))
+            digest.update(b'\0')
+
+    def walk(elem):
+        update('<', elem.tag, *(i for item in sorted(elem.attrib.items()) for i in item))
+        # Whitespace is only insignificant in between child elements.
+        text = elem.text or ''
+        update(text if len(elem) == 0 or text.strip() else '')
+        for child in elem:
+            walk(child)
+            tail = child.tail or ''
+            update(tail if tail.strip() else '')
+        update('>')
+
+    walk(ElementTree.fromstring(config))
+    return digest.hexdigest()
+
+def _job_enabled(info):
+    if info.get('disabled') is not None:
+        return not info['disabled']
+    if info.get('color') is not None:
+        return info['color'] != 'disabled'
+    return bool(info.get('buildable'))
+
+def _parse_config(res):
+    # The cost of `'lxml' in sys.modules` is negligible and is
+    # preferable to having a hard dependency on lxml.
+    from lxml import etree
+    return etree.fromstring(res.text.encode('utf8'))
+
+def _view_jobnames(config):
+    return frozenset(config.xpath('jobNames/string/text()'))
+
+def _walk_tree(levels):
+    '''Tree projection of the names of jobs in ``levels`` levels of folders.'''
+    # Only folders have a 'jobs' field - an empty range is enough to tell them apart.
+    tree = 'jobs{0,0}'
+    for i in range(levels):
+        tree = 'jobs[name,%s]' % tree
+    return tree
+
+def _walk_names(info, folder, depth, count, max_depth, pending):
+    '''
+    Yield the full names of the jobs in a :func:`_walk_tree` response. The
+    folders that need another request are appended to ``pending``.
+    '''
+    stack = [(folder, depth, count, info['jobs'])]
+    while stack:
+        folder, depth, count, items = stack.pop()
+        prefix = folder + '/' if folder else ''
+        for item in items:
+            name = prefix + item['name']
+            if 'jobs' not in item:
+                yield name
+            elif max_depth is not None and depth >= max_depth:
+                continue
+            elif count > 1:
+                stack.append((name, depth + 1, count - 1, item['jobs']))
+            else:
+                pending.append((name, depth + 1))
+
+def _release_on_close(res, limit):
+    '''Release a :class:`RateLimit` slot when a streamed response is closed.'''
+    close, released = res.close, []
+
+    def release_and_close():
+        try:
+            close()
+        finally:
+            if not released:
+                released.append(True)
+                limit.release()
+
+    res.close = release_and_close
+
+def _count_received(res, metrics, method, path):
+    '''Record the bytes of a streamed response body in :class:`RequestMetrics` as they are read.'''
+    iter_content = res.iter_content
+
+    def counting_iter_content(*args, **kw):
+        for chunk in iter_content(*args, **kw):
+            metrics.received(method, path, len(chunk))
+            yield chunk
+
+    res.iter_content = counting_iter_content
+
+def _endpoint_class(url):
+    '''Classify an url as a json, console, config or other endpoint.'''
+    path = url.split('?', 1)[0].rstrip('/')
+    if path.endswith('api/json'):
+        return 'json'
+    if path.endswith(('progressiveText', 'consoleText')):
+        return 'console'
+    if path.endswith('config.xml'):
+        return 'config'
+    return 'other'
+
+def _pointers_tree(fields=None):
+    fields = ','.join(['number'] + list(fields or []))
+    return ','.join('%s[%s]' % (key, fields) for name, key in _pointer_fields)
+
+def _pointers(job, info, fields, build_factory):
+    res = {}
+    for name, key in _pointer_fields:
+        item = info.get(key)
+        build = build_factory(job, item['number']) if item else None
+        res[name] = (build, item) if fields else build
+    return res
+
+def _intern(value):
+    # Share the few distinct strings (colors, results) between records.
+    return _intern_str(value) if isinstance(value, str) else value
+
 #-----------------------------------------------------------------------------
 class JenkinsError(Exception):
     '''Exception type for Jenkins-API related failures.'''
@@ -836,6 +2640,10 @@ class JenkinsError(Exception):
         self.msg = msg
 
 
+class CircuitOpenError(JenkinsError):
+    '''Raised instead of sending requests while a :class:`CircuitBreaker` is open.'''
+
+
 #-----------------------------------------------------------------------------
 # Uncomment to enable http logging
 # try:
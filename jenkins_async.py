@@ -0,0 +1,1044 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8; -*-
+
+'''
+An asyncio-native client for the Jenkins remote access API. It mirrors the
+object model of the :mod:`jenkins` module, but every method that talks to
+Jenkins is a coroutine and every property that talks to Jenkins returns an
+awaitable:
+
+    >>> async with AsyncJenkins('http://server:port', 'user', 'pass') as j:
+    ...     names = await j.jobnames
+    ...     found = await asyncio.gather(*(j.job_exists(i) for i in names))
+
+All requests share a single pool of connections (see :class:`AsyncServer`).
+Requires Python >= 3.6 (for async generators) and aiohttp_.
+
+.. _aiohttp: https://docs.aiohttp.org/
+'''
+
+import ssl
+import asyncio
+
+from collections import OrderedDict
+
+import aiohttp
+
+from jenkins import (
+    Jenkins, Job, View, Node, Build, QueueItem, NodeLaunchMethod, JobSummary, BatchResult, ViewIndex,
+    JenkinsError, CircuitOpenError, HTTPError, json, mergedict, config_digest, _missing,
+    _enabled_tree, _job_enabled, _PollSchedule, _LineDecoder, _pointers_tree, _pointers,
+    _walk_tree, _walk_names,
+)
+
+
+#-----------------------------------------------------------------------------
+__all__ = (
+    'AsyncJenkins',
+    'AsyncServer',
+    'AsyncJob',
+    'AsyncBuild',
+    'AsyncQueueItem',
+    'AsyncView',
+    'AsyncNode',
+    'AsyncViewIndex',
+)
+
+
+#-----------------------------------------------------------------------------
+class _AsyncJenkinsBase(object):
+    '''Base class for asynchronous Jenkins objects.'''
+
+    async def get_info(self, tree=None, depth=0, cached=True):
+        url = self.url('api/json')
+        err = '%s does not exist' % str(self)
+        return await self.server.json(url, errmsg=err, tree=tree, params={'depth': depth})
+
+    @property
+    def info(self):
+        return self.get_info()
+
+    @property
+    def exists(self):
+        '''Check if object exists.'''
+        return self._exists()
+
+    async def _exists(self):
+        try:
+            await self.get_info(tree=self._exists_tree)
+            return True
+        except HTTPError as e:
+            if e.response.status_code == 404:
+                return False
+            raise
+        except CircuitOpenError:
+            raise
+        except JenkinsError:
+            return False
+
+    @property
+    def config(self):
+        return self.get_config()
+
+    async def get_config(self):
+        url = self.url('config.xml')
+        res = await self.server.get(url)
+        if res.status_code != 200 or not res.headers.get('content-type', '').startswith('application/xml'):
+            msg = 'fetching configuration for item "%s" did not return an xml document'
+            raise JenkinsError(msg % self.name)
+        return res.text
+
+    @property
+    def config_etree(self):
+        return self.get_config_etree()
+
+    async def get_config_etree(self):
+        from lxml import etree
+        config = await self.get_config()
+        return etree.fromstring(config.encode('utf8'))
+
+    async def reconfigure(self, newconfig, optimistic=None):
+        '''Update the config.xml of an existing item.'''
+        url = self.url('config.xml')
+        headers = {'Content-Type': 'text/xml'}
+        params = {'name': self.name}
+        return await self._post_existing(url, optimistic, data=newconfig, params=params, headers=headers)
+
+    async def reconfigure_etree(self, newconfig_etree, optimistic=None):
+        from lxml import etree
+        return await self.reconfigure(etree.tostring(newconfig_etree), optimistic)
+
+    async def reconfigure_if_changed(self, newconfig):
+        '''Update the config.xml of an existing item, unless it is equivalent to the current one.'''
+        if config_digest(await self.get_config()) == config_digest(newconfig):
+            return False
+        await self.reconfigure(newconfig, optimistic=True)
+        return True
+
+    async def _not_exist_raise(self):
+        if not await self.exists:
+            raise JenkinsError('%s does not exist' % str(self))
+
+    async def _post_existing(self, url, optimistic=None, **kw):
+        if not self._is_optimistic(optimistic):
+            await self._not_exist_raise()
+            return await self.server.post(url, **kw)
+
+        res = await self.server.post(url, throw=False, **kw)
+        if res.status_code == 404:
+            raise JenkinsError('%s does not exist' % str(self))
+        res.raise_for_status()
+        return res
+
+
+#-----------------------------------------------------------------------------
+class AsyncJob(_AsyncJenkinsBase, Job):
+    '''Represents a Jenkins job.'''
+
+    __slots__ = ()
+
+    async def delete(self, optimistic=None):
+        '''Permanently remove job.'''
+        url = self.url('doDelete')
+        if self._is_optimistic(optimistic):
+            return await self._post_existing(url, optimistic=True)
+
+        await self._not_exist_raise()
+        res = await self.server.post(url, throw=False)
+        if await self.exists:
+            raise JenkinsError('delete of job "%s" failed' % self.name)
+        return res
+
+    async def enable(self, optimistic=None):
+        '''Enable job.'''
+        url = self.url('enable')
+        return await self._post_existing(url, optimistic)
+
+    async def disable(self, optimistic=None):
+        '''Disable job.'''
+        url = self.url('disable')
+        return await self._post_existing(url, optimistic)
+
+    async def build(self, parameters=None, token=None, optimistic=None):
+        '''Trigger a build.'''
+        params = {}
+        if token:
+            params['token'] = token
+
+        if parameters:
+            params.update(parameters)
+            url = self.url('buildWithParameters')
+        else:
+            url = self.url('build')
+
+        res = await self._post_existing(url, optimistic, params=params)
+        return AsyncQueueItem.from_response(self, res)
+
+    @property
+    def enabled(self):
+        return self._enabled()
+
+    async def _enabled(self):
+        return _job_enabled(await self.get_info(tree=_enabled_tree))
+
+    @property
+    def builds(self):
+        return self._builds()
+
+    async def _builds(self):
+        info = await self.get_info(tree='builds[number]')
+        return [AsyncBuild(self, i['number']) for i in info['builds']]
+
+    async def _last_build_helper(self, path):
+        url = self.url(path + '/api/json')
+        res = await self.server.json(url, tree='number')
+        return AsyncBuild(self, res['number'])
+
+    @property
+    def last_build(self):
+        return self._last_build_helper('lastBuild')
+
+    @property
+    def last_stable_build(self):
+        return self._last_build_helper('lastStableBuild')
+
+    @property
+    def last_successful_build(self):
+        return self._last_build_helper('lastSuccessfulBuild')
+
+    async def build_pointers(self, fields=None):
+        '''See :meth:`jenkins.Job.build_pointers`.'''
+        info = await self.get_info(tree=_pointers_tree(fields))
+        return _pointers(self, info, fields, AsyncBuild)
+
+    @property
+    def buildnumbers(self):
+        return self._buildnumbers()
+
+    async def _buildnumbers(self):
+        info = await self.get_info(tree='builds[number]')
+        return [i['number'] for i in info['builds']]
+
+    async def iter_builds(self, start=0, page_size=100, fields=None):
+        '''
+        Asynchronously iterate over all builds of the job, newest first.
+        See :meth:`jenkins.Job.iter_builds`.
+        '''
+        tree = ','.join(['number'] + list(fields or []))
+        while True:
+            end = start + page_size
+            info = await self.get_info(tree='allBuilds[%s]{%d,%d}' % (tree, start, end))
+            page = info.get('allBuilds') or []
+            for item in page:
+                build = AsyncBuild(self, item['number'])
+                yield (build, item) if fields else build
+
+            if len(page) < page_size:
+                break
+            start = end
+
+    @classmethod
+    async def create(cls, name, configxml, server, optimistic=None):
+        '''Create a new Jenkins job.'''
+
+        job = cls(name, server)
+        if not job._is_optimistic(optimistic) and await job.exists:
+            raise JenkinsError('job "%s" already exists' % name)
+
+        headers = {'Content-Type': 'text/xml'}
+        params = {'name': job.basename}
+        res = await server.post(job._create_url(), data=configxml, params=params, headers=headers,
+                                throw=False)
+
+        if not res or res.status_code != 200:
+            raise JenkinsError('create "%s" failed' % name)
+
+    @classmethod
+    async def copy(cls, source, dest, server, optimistic=None):
+        '''Copy a Jenkins job.'''
+
+        job = cls(source, server)
+        newjob = cls(dest, server)
+
+        headers = {'Content-Type': 'text/xml'}
+        params = newjob._copy_params(job)
+        msg = 'could not copy job "%s" to "%s"'
+
+        if job._is_optimistic(optimistic):
+            res = await server.post(newjob._create_url(), params=params, headers=headers, throw=False)
+            if not res:
+                raise JenkinsError(msg % (source, dest))
+            return newjob
+
+        if await newjob.exists:
+            raise JenkinsError('job "%s" already exists' % dest)
+
+        if not await job.exists:
+            raise JenkinsError('job "%s" does not exist' % source)
+
+        await server.post(newjob._create_url(), params=params, headers=headers)
+
+        if not await newjob.exists:
+            raise JenkinsError(msg % (source, dest))
+
+        return newjob
+
+
+#-----------------------------------------------------------------------------
+class AsyncView(_AsyncJenkinsBase, View):
+    '''Represents a Jenkins view.'''
+
+    __slots__ = ()
+
+    @property
+    def jobs(self):
+        return self._jobs()
+
+    async def _jobs(self):
+        info = await self.get_info(tree='jobs[name]')
+        return [AsyncJob(i['name'], self.server) for i in info['jobs']]
+
+    @property
+    def jobnames(self):
+        return self._jobnames()
+
+    async def _jobnames(self):
+        info = await self.get_info(tree='jobs[name]')
+        return [i['name'] for i in info['jobs']]
+
+    async def delete(self, optimistic=None):
+        '''Permanently remove view.'''
+        url = self.url('doDelete')
+        if self._is_optimistic(optimistic):
+            return await self._post_existing(url, optimistic=True)
+
+        await self._not_exist_raise()
+        res = await self.server.post(url, throw=False)
+        if await self.exists:
+            raise JenkinsError('delete of view "%s" failed' % self.name)
+        return res
+
+    async def remove_job(self, job, optimistic=None):
+        '''Remove job from view.'''
+        msg = 'could not remove job "%s" from view "%s"'
+        await self._post_job('removeJobFromView', job, msg, optimistic)
+
+    async def add_job(self, job, optimistic=None):
+        '''Add job to the view.'''
+        msg = 'could not add job "%s" to view "%s"'
+        await self._post_job('addJobToView', job, msg, optimistic)
+
+    async def _post_job(self, path, job, errmsg, optimistic):
+        optimistic = self._is_optimistic(optimistic)
+        if not optimistic:
+            if not await self.exists:
+                raise JenkinsError('view "%s" does not exist' % self.name)
+
+            if not await job.exists:
+                raise JenkinsError('job "%s" does not exist' % job.name)
+
+        url = self.url(path)
+        params = {'name': job.name}
+        res = await self.server.post(url, params=params, throw=not optimistic)
+
+        if optimistic and res.status_code == 404:
+            raise JenkinsError('view "%s" does not exist' % self.name)
+
+        if optimistic and res.status_code == 400:
+            raise JenkinsError('job "%s" does not exist' % job.name)
+
+        if not res.status_code == 200:
+            raise JenkinsError(errmsg % (job.name, self.name))
+
+    async def has_job(self, job):
+        '''Check if view contains job.'''
+        config = await self.get_config_etree()
+        jobs = config.xpath('jobNames/string/text()')
+        job = getattr(job, 'name', job)
+        return job in jobs
+
+    def __contains__(self, job):
+        # The result of __contains__ is always coerced to a bool.
+        raise TypeError('use "await view.has_job(job)" instead of "job in view"')
+
+    @classmethod
+    async def create(cls, name, configxml, server, optimistic=None):
+        '''Create a new Jenkins view.'''
+
+        view = cls(name, server)
+        if not view._is_optimistic(optimistic) and await view.exists:
+            raise JenkinsError('view "%s" already exists' % name)
+
+        headers = {'Content-Type': 'text/xml'}
+        params = {'name': name}
+        res = await server.post('createView', data=configxml, params=params, headers=headers, throw=False)
+
+        if not res or res.status_code != 200:
+            raise JenkinsError('create "%s" failed' % name)
+
+
+#-----------------------------------------------------------------------------
+class AsyncNode(_AsyncJenkinsBase, Node):
+    '''Represents a Jenkins node.'''
+
+    __slots__ = ()
+
+    @classmethod
+    async def create(cls, name, remotefs, server,
+                     num_executors=2,
+                     node_description=None,
+                     labels=None,
+                     exclusive=False,
+                     launcher=NodeLaunchMethod.COMMAND,
+                     launcher_params={},
+                     optimistic=None):
+        '''Create a new Jenkins node. See :meth:`jenkins.Node.create`.'''
+        node = cls(name, server)
+        if not node._is_optimistic(optimistic) and await node.exists:
+            raise JenkinsError('node "%s" already exists' % name)
+
+        mode = 'EXCLUSIVE' if exclusive else 'NORMAL'
+        launcher_params = mergedict(launcher_params, {'stapler-class': launcher})
+
+        inner_params = {
+            'name': name,
+            'nodeDescription': node_description,
+            'numExecutors': num_executors,
+            'remoteFS': remotefs,
+            'labelString': labels,
+            'mode': mode,
+            'type': 'hudson.slaves.DumbSlave$DescriptorImpl',
+            'retentionStrategy': {
+                'stapler-class':
+                'hudson.slaves.RetentionStrategy$Always'
+            },
+            'nodeProperties': {'stapler-class-bag': 'true'},
+            'launcher': launcher_params
+        }
+
+        params = {
+            'name': name,
+            'type': 'hudson.slaves.DumbSlave$DescriptorImpl',
+            'json': json.dumps(inner_params)
+        }
+
+        res = await server.post('computer/doCreateItem', params=params, throw=False)
+
+        if not res or res.status_code != 200:
+            raise JenkinsError('create "%s" failed' % name)
+
+    async def delete(self, optimistic=None):
+        '''Permanently remove node.'''
+        url = self.url('doDelete')
+        if self._is_optimistic(optimistic):
+            return await self._post_existing(url, optimistic=True)
+
+        await self._not_exist_raise()
+        res = await self.server.post(url, throw=False)
+        if await self.exists:
+            raise JenkinsError('delete of node "%s" failed' % self.name)
+        return res
+
+    async def reconfigure(self, newconfig, optimistic=None):
+        raise NotImplementedError
+
+
+#-----------------------------------------------------------------------------
+class AsyncBuild(_AsyncJenkinsBase, Build):
+    '''Represents a Jenkins build.'''
+
+    __slots__ = ()
+
+    @property
+    def building(self):
+        return self._building()
+
+    async def _building(self):
+        info = await self.get_info(tree='building')
+        return info['building']
+
+    async def stop(self):
+        url = self.url('stop')
+        return await self.server.post(url)
+
+    async def wait(self, tick=1, timeout=None, max_tick=30, backoff=1.5, jitter=0.1):
+        '''
+        Wait for build to complete and return its result (or None if the
+        build is still running after ``timeout`` seconds).
+        See :meth:`jenkins.Build.wait`.
+        '''
+        schedule = _PollSchedule(tick, timeout, max_tick, backoff, jitter)
+        while True:
+            info = await self.get_info(tree=_PollSchedule.tree)
+            if not info['building']:
+                return info['result']
+
+            delay = schedule.next(info)
+            if delay is None:
+                return None
+            await asyncio.sleep(delay)
+
+    async def iter_console(self, follow=True, start=0, tick=1, encoding='utf-8', chunk_size=65536):
+        '''
+        Asynchronously iterate over the lines of the console log.
+        See :meth:`jenkins.Build.iter_console`.
+        '''
+        url = self.url('logText/progressiveText')
+        decoder = _LineDecoder(encoding)
+        while True:
+            async with self.server.stream('GET', url, params={'start': start}) as res:
+                async for chunk in res.content.iter_chunked(chunk_size):
+                    for line in decoder.feed(chunk):
+                        yield line
+                start = int(res.headers.get('X-Text-Size', start))
+                more = res.headers.get('X-More-Data', '').lower() == 'true'
+
+            if not (follow and more):
+                break
+            await asyncio.sleep(tick)
+
+        tail = decoder.flush()
+        if tail:
+            yield tail
+
+
+#-----------------------------------------------------------------------------
+class AsyncQueueItem(_AsyncJenkinsBase, QueueItem):
+    '''Represents a build request in the Jenkins queue.'''
+
+    __slots__ = ()
+    _build_factory = AsyncBuild
+
+    @property
+    def build(self):
+        return self._build()
+
+    async def _build(self):
+        return self._started(await self.get_info(tree=self.tree, cached=False))
+
+    async def wait_until_started(self, tick=1, timeout=None, max_tick=30, backoff=1.5, jitter=0.1):
+        '''
+        Wait for the item to leave the queue and return the build that it
+        started. See :meth:`jenkins.QueueItem.wait_until_started`.
+        '''
+        schedule = _PollSchedule(tick, timeout, max_tick, backoff, jitter)
+        while True:
+            info = await self.get_info(tree=self.tree, cached=False)
+            build = self._started(info)
+            if build is not None:
+                return build
+
+            delay = schedule.next(info)
+            if delay is None:
+                return None
+            await asyncio.sleep(delay)
+
+    async def cancel(self):
+        return await self.server.post('queue/cancelItem', params={'id': self.id})
+
+
+#-----------------------------------------------------------------------------
+class AsyncViewIndex(ViewIndex):
+    '''Asynchronous :class:`jenkins.ViewIndex` - ``refresh()`` is a coroutine.'''
+
+    async def refresh(self, *views):
+        if not views:
+            info = await self.jenkins.server.json('api/json', 'unable to retrieve info', tree=self.tree)
+            return self._update(info['views'], complete=True)
+
+        views = [self.jenkins.view(getattr(name, 'name', name)) for name in views]
+        infos = await asyncio.gather(*(self._jobs(i) for i in views))
+        return self._update({'name': v.name, 'jobs': i} for v, i in zip(views, infos))
+
+    async def _jobs(self, view):
+        try:
+            info = await view.get_info(tree='jobs[name]')
+        except HTTPError as e:
+            if e.response.status_code != 404:
+                raise
+            return None
+        return info['jobs']
+
+
+#-----------------------------------------------------------------------------
+class AsyncResponse(object):
+    '''A fully read response. Mirrors the parts of requests.Response that are used.'''
+
+    __slots__ = 'url', 'status_code', 'reason', 'headers', 'content', 'encoding'
+
+    def __init__(self, url, status_code, reason, headers, content, encoding):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+
+    def __repr__(self):
+        return '<AsyncResponse [%d]>' % self.status_code
+
+    def __bool__(self):
+        return self.ok
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            msg = '%d Error: %s for url: %s' % (self.status_code, self.reason, self.url)
+            raise HTTPError(msg, response=self)
+
+
+class _StreamContext(object):
+    def __init__(self, server, method, url, params, headers, throw):
+        self.server = server
+        self.args = method, server.urljoin(url)
+        self.kw = {'params': params, 'headers': headers}
+        self.throw = throw
+        self.response = None
+
+    async def __aenter__(self):
+        session = self.server._get_session()
+        self.response = res = await session.request(*self.args, **self.kw)
+        if self.throw and res.status >= 400:
+            res.release()
+            AsyncResponse(str(res.url), res.status, res.reason, res.headers, b'', None).raise_for_status()
+        return res
+
+    async def __aexit__(self, *exc_info):
+        self.response.release()
+
+
+#-----------------------------------------------------------------------------
+class AsyncServer(object):
+    def __init__(self, url, username=None, password=None, verify=True, cert=None,
+                 limit=100, limit_per_host=0, keep_alive=True, optimistic=False):
+        '''
+        :param url: base url of the Jenkins instance, ``str``
+        :param username: username for basic authentication, ``str``
+        :param password: password or api token for basic authentication, ``str``
+        :param verify: verify tls certificates or path to a ca bundle, ``bool|str``
+        :param cert: client certificate, ``str|tuple``
+        :param limit: maximum number of simultaneous connections, ``int``
+        :param limit_per_host: maximum number of connections per host (0 is unlimited), ``int``
+        :param keep_alive: reuse connections between requests, ``bool``
+        :param optimistic: skip existence checks before mutating requests, ``bool``
+        '''
+        self.url = url if url.endswith('/') else url + '/'
+        self.auth = aiohttp.BasicAuth(username, password or '') if username else None
+        self.verify = verify
+        self.cert = cert
+        self.optimistic = optimistic
+
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keep_alive = keep_alive
+
+        # The session must be created from within a running event loop.
+        self.session = None
+
+        self._crumb_lock = None
+        self._crumb_header = _missing
+        self._crumb_cookie = None
+
+    def __repr__(self):
+        cls = self.__class__.__name__
+        return '%s(%s)' % (cls, self.url)
+
+    def __hash__(self):
+        key = (self.url, self.verify, self.cert, self.__class__,
+               self.auth.login if self.auth else None,
+               self.auth.password if self.auth else None)
+        return hash(key)
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) \
+            and self.url == other.url \
+            and self.verify == other.verify \
+            and self.cert == other.cert \
+            and self.auth == other.auth
+
+    def _ssl_context(self):
+        if self.verify is True and not self.cert:
+            return None
+
+        cafile = self.verify if isinstance(self.verify, str) else None
+        ctx = ssl.create_default_context(cafile=cafile)
+        if self.verify is False:
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+        if self.cert:
+            certfile, keyfile = self.cert if isinstance(self.cert, tuple) else (self.cert, None)
+            ctx.load_cert_chain(certfile, keyfile)
+        return ctx
+
+    def _get_session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                force_close=not self.keep_alive,
+                ssl=self._ssl_context(),
+            )
+            # Jenkins is often accessed by ip address - accept its cookies.
+            jar = aiohttp.CookieJar(unsafe=True)
+            self.session = aiohttp.ClientSession(connector=connector, cookie_jar=jar, auth=self.auth)
+        return self.session
+
+    async def close(self):
+        '''Close all pooled connections.'''
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def urljoin(self, *args):
+        return '%s%s' % (self.url, '/'.join(args))
+
+    def invalidate(self, *prefixes):
+        # AsyncServer does not cache object information.
+        pass
+
+    async def request(self, method, url, params=None, data=None, headers=None):
+        session = self._get_session()
+        url = self.urljoin(url)
+        async with session.request(method, url, params=params, data=data, headers=headers) as res:
+            content = await res.read()
+            return AsyncResponse(str(res.url), res.status, res.reason, res.headers, content, res.charset)
+
+    def stream(self, method, url, params=None, headers=None, throw=True):
+        '''
+        Send a request and return an async context manager for the raw
+        aiohttp response, the body of which has not been read yet.
+        '''
+        return _StreamContext(self, method, url, params, headers, throw)
+
+    def _session_cookie(self):
+        if self.session is None:
+            return ()
+        cookies = ((c.key, c.value) for c in self.session.cookie_jar if c.key.startswith('JSESSIONID'))
+        return tuple(sorted(cookies))
+
+    async def fetch_crumb(self):
+        '''Get crumb (or None if doesn't exist) from the Jenkins.'''
+        url = 'crumbIssuer/api/json'
+        try:
+            return await self.json(url, 'unable to retrieve crumb')
+        except HTTPError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+        except CircuitOpenError:
+            raise
+        except JenkinsError:
+            return None
+
+    @property
+    def crumb_header(self):
+        '''Crumb header sent with every POST request (fetched on first use).'''
+        return self._get_crumb_header()
+
+    @crumb_header.setter
+    def crumb_header(self, header):
+        self._crumb_header = header
+        self._crumb_cookie = self._session_cookie()
+
+    async def _get_crumb_header(self):
+        if self._crumb_lock is None:
+            self._crumb_lock = asyncio.Lock()
+
+        async with self._crumb_lock:
+            if self._crumb_header is _missing or self._crumb_cookie != self._session_cookie():
+                crumb = await self.fetch_crumb()
+                self._crumb_header = {crumb['crumbRequestField']: crumb['crumb']} if crumb else None
+                self._crumb_cookie = self._session_cookie()
+            return self._crumb_header
+
+    def invalidate_crumb(self):
+        '''Discard the cached crumb - it will be fetched again on the next POST.'''
+        self._crumb_header = _missing
+
+    async def _post(self, url, params=None, data=None, headers=None):
+        crumb_header = await self._get_crumb_header()
+        if crumb_header is not None:
+            headers = mergedict(headers or {}, crumb_header)
+        return await self.request('POST', url, params=params, data=data, headers=headers)
+
+    async def post(self, url, throw=True, **kw):
+        res = await self._post(url, **kw)
+
+        # See Server.post().
+        if res.status_code == 403 and 'No valid crumb' in res.text:
+            self.invalidate_crumb()
+            res = await self._post(url, **kw)
+
+        throw and res.raise_for_status()
+        return res
+
+    async def get(self, url, throw=True, **kw):
+        res = await self.request('GET', url, **kw)
+        throw and res.raise_for_status()
+        return res
+
+    async def json(self, url, errmsg=None, throw=True, tree=None, params=None, **kw):
+        '''
+        Fetch and decode a json document. The ``tree`` argument limits the
+        response to the given fields (e.g. ``'jobs[name,color]'``).
+        '''
+        if tree:
+            params = mergedict(params or {}, {'tree': tree})
+        try:
+            res = await self.request('GET', url, params=params, **kw)
+            throw and res.raise_for_status()
+            if not res:
+                raise JenkinsError(errmsg)
+            return res.json()
+        except ValueError:
+            raise JenkinsError('unparsable json response')
+
+
+#-----------------------------------------------------------------------------
+class AsyncJenkins(Jenkins):
+    '''
+    Asynchronous handle to a Jenkins instance. The method and property names
+    are the same as those of :class:`jenkins.Jenkins`, but they return
+    awaitables.
+    '''
+
+    def __init__(self, url, username=None, password=None, verify=True, cert=None, **kw):
+        '''
+        Create handle to Jenkins instance. Additional keyword arguments
+        (e.g. ``limit``, ``keep_alive``) are passed to :class:`AsyncServer`.
+        '''
+
+        self.server = AsyncServer(url, username, password, verify, cert, **kw)
+        self.url = self.server.url
+
+    async def close(self):
+        '''Close all pooled connections to the Jenkins instance.'''
+        await self.server.close()
+
+    def __enter__(self):
+        raise TypeError('use "async with" instead')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get_info(self, tree=None):
+        '''Get information about this Jenkins instance.'''
+        return await self.server.json('api/json', 'unable to retrieve info', tree=tree)
+
+    @property
+    def info(self):
+        return self.get_info()
+
+    async def get_computer(self, tree=None):
+        '''Get information about the Jenkins build executors.'''
+        return await self.server.json('computer/api/json', 'unable to retrieve info', tree=tree)
+
+    @property
+    def computer(self):
+        return self.get_computer()
+
+    @property
+    def crumb(self):
+        return self.server.fetch_crumb()
+
+    @property
+    def crumb_header(self):
+        return self.server.crumb_header
+
+    @property
+    def jobs(self):
+        return self._jobs()
+
+    async def _jobs(self):
+        return [self.job(name) for name in await self.jobnames]
+
+    @property
+    def xjobs(self):
+        raise TypeError('use "await jenkins.jobs" instead')
+
+    def xjob_summaries(self, fields=None):
+        raise TypeError('use "await jenkins.job_summaries()" instead')
+
+    @property
+    def jobnames(self):
+        return self._names('jobs')
+
+    @property
+    def views(self):
+        return self._views()
+
+    async def _views(self):
+        return [self.view(name) for name in await self.viewnames]
+
+    @property
+    def viewnames(self):
+        return self._names('views')
+
+    async def _names(self, key):
+        info = await self.get_info(tree='%s[name]' % key)
+        return [i['name'] for i in info[key]]
+
+    async def view_index(self):
+        index = AsyncViewIndex(self)
+        await index.refresh()
+        return index
+
+    async def jobs_build_pointers(self, fields=None):
+        info = await self.get_info(tree='jobs[name,%s]' % _pointers_tree(fields))
+        return dict((i['name'], _pointers(self.job(i['name']), i, fields, self.build)) for i in info['jobs'])
+
+    async def walk_jobs(self, max_depth=None, levels=3):
+        '''
+        Asynchronously iterate over the jobs in all folders.
+        See :meth:`jenkins.Jenkins.walk_jobs`.
+        '''
+        pending = [('', 0)]
+        while pending:
+            folder, depth = pending.pop(0)
+            count = levels if max_depth is None else min(levels, max_depth - depth + 1)
+            url = Job(folder, self.server).url('api/json') if folder else 'api/json'
+            info = await self.server.json(url, 'unable to retrieve info', tree=_walk_tree(count))
+            for name in _walk_names(info, folder, depth, count, max_depth, pending):
+                yield self.job(name)
+
+    async def jobs_enabled(self):
+        info = await self.get_info(tree='jobs[name,%s]' % _enabled_tree)
+        return dict((i['name'], _job_enabled(i)) for i in info['jobs'])
+
+    async def job_summaries(self, fields=None):
+        info = await self.get_info(tree=JobSummary.tree(fields))
+        return [JobSummary.from_json(i) for i in info['jobs']]
+
+    async def queue_resolve(self, items):
+        info = await self.server.json('queue/api/json', 'unable to retrieve queue', tree='items[id]')
+        waiting = set(i['id'] for i in info['items'])
+
+        jobs = list(set(i.job for i in items if i.id not in waiting))
+        infos = await asyncio.gather(*(i.get_info(tree='builds[number,queueId]', cached=False) for i in jobs),
+                                     return_exceptions=True)
+        started = dict((b.get('queueId'), b['number'])
+                       for i in infos if not isinstance(i, Exception) for b in i['builds'])
+
+        res = []
+        for item in items:
+            if item.id in waiting:
+                res.append(BatchResult(item, None, None))
+            elif item.id in started:
+                res.append(BatchResult(item, item._build_factory(item.job, started[item.id]), None))
+            else:
+                try:
+                    res.append(BatchResult(item, await item.build, None))
+                except Exception as error:
+                    res.append(BatchResult(item, None, error))
+        return res
+
+    @property
+    def nodes(self):
+        return self._nodes()
+
+    async def _nodes(self):
+        return [self.node(name) for name in await self.nodenames]
+
+    @property
+    def nodenames(self):
+        return self._nodenames()
+
+    async def _nodenames(self):
+        computer = await self.get_computer(tree='computer[displayName]')
+        names = (comp['displayName'] for comp in computer['computer'])
+        return [name if name != 'master' else '(master)' for name in names]
+
+    #-------------------------------------------------------------------------
+    def job(self, name):
+        return AsyncJob(name, self.server)
+
+    def view(self, name):
+        return AsyncView(name, self.server)
+
+    def build(self, name, number):
+        job = name if isinstance(name, Job) else self.job(name)
+        return AsyncBuild(job, number)
+
+    def node(self, name):
+        return AsyncNode(name, self.server)
+
+    def queue_item(self, name, id):
+        job = name if isinstance(name, Job) else self.job(name)
+        return AsyncQueueItem(job, id)
+
+    def batch(self, max_workers=8):
+        raise TypeError('use asyncio.gather() to run operations concurrently')
+
+    async def reconfigure_many(self, configs, max_workers=8):
+        '''
+        Reconfigure many jobs, posting only the configurations that changed.
+        See :meth:`jenkins.Jenkins.reconfigure_many`.
+        '''
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def reconfigure(name):
+            async with semaphore:
+                try:
+                    changed = await self.job(name).reconfigure_if_changed(configs[name])
+                except Exception as error:
+                    return BatchResult(name, None, error)
+            return BatchResult(name, 'changed' if changed else 'unchanged', None)
+
+        results = await asyncio.gather(*(reconfigure(i) for i in configs))
+        return OrderedDict((i.item, i) for i in results)
+
+    #-------------------------------------------------------------------------
+    # Methods that are not thin wrappers around a single object coroutine.
+    async def job_reconfigure(self, name, newconfig, optimistic=None):
+        job = self.job(name)
+        await job.reconfigure(newconfig, optimistic)
+        return job
+
+    async def job_reconfigure_etree(self, name, newconfig):
+        job = self.job(name)
+        await job.reconfigure_etree(newconfig)
+        return job
+
+    def job_create(self, name, config, optimistic=None):
+        return AsyncJob.create(name, config, self.server, optimistic)
+
+    def job_copy(self, source, dest, optimistic=None):
+        return AsyncJob.copy(source, dest, self.server, optimistic)
+
+    def build_wait(self, job, number, interval=1, timeout=None):
+        return self.build(job, number).wait(interval, timeout)
+
+    async def view_reconfigure(self, name, newconfig, optimistic=None):
+        view = self.view(name)
+        await view.reconfigure(newconfig, optimistic)
+        return view
+
+    async def view_reconfigure_etree(self, name, newconfig):
+        view = self.view(name)
+        await view.reconfigure_etree(newconfig)
+        return view
+
+    def view_create(self, name, config, optimistic=None):
+        return AsyncView.create(name, config, self.server, optimistic)
+
+    def node_create(self, name, remotefs, *args, **kw):
+        return AsyncNode.create(name, remotefs, self.server, *args, **kw)
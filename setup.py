@@ -4,6 +4,11 @@ requires = [
     'requests>=2.8.0',
 ]
 
+extras_require = {
+    # The jenkins_async module uses async generators.
+    'async': ['aiohttp >= 3.0; python_version >= "3.6"'],
+}
+
 tests_require = [
     'pytest >= 3.5.0',
     'pytest-cov >= 2.5.0',
@@ -34,8 +39,9 @@ kw = {
     'url':              'https://github.com/gvalkov/jenkins-webapi',
     'keywords':         'jenkins ci',
     'classifiers':      classifiers,
-    'py_modules':       ['jenkins'],
+    'py_modules':       ['jenkins', 'jenkins_async'],
     'install_requires': requires,
+    'extras_require':   extras_require,
     'tests_require':    tests_require,
     'zip_safe':         True,
 }
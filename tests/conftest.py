@@ -35,6 +35,8 @@ environments = [
 def pytest_addoption(parser):
     parser.addoption('--reuse-jenkins', action='store_true',
                      help='do not send a shutdown signal to Jenkins upon exit')
+    parser.addoption('--bench-sizes', default='100',
+                     help='comma-separated job counts to run the benchmarks with')
 
 
 #-----------------------------------------------------------------------------
@@ -0,0 +1,1033 @@
+# -*- coding: utf-8; -*-
+
+'''
+An in-process stand-in for Jenkins that emulates the parts of the remote
+access api used by jenkins-webapi. It needs nothing but the standard library,
+can synthesize large inventories of jobs and builds and can inject latency:
+
+    with FakeJenkins(latency=0.01) as fake:
+        fake.populate(jobs=10000, builds=20, views=10, nodes=5)
+        j = Jenkins(fake.url)
+
+Builds are not stored until they are triggered - the history of a populated
+job is computed on demand, so tens of thousands of jobs cost little memory.
+'''
+
+import re
+import json
+import time
+import zlib
+import random
+import threading
+import xml.etree.ElementTree as etree
+
+from collections import namedtuple
+from xml.sax.saxutils import escape
+
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit, parse_qsl, unquote
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit, parse_qsl
+    from urllib import unquote
+
+
+#-----------------------------------------------------------------------------
+job_config_template = u'''\
+<?xml version='1.1' encoding='UTF-8'?>
+<project>
+  <actions/>
+  <description>{description}</description>
+  <keepDependencies>false</keepDependencies>
+  <properties/>
+  <scm class="hudson.scm.NullSCM"/>
+  <canRoam>true</canRoam>
+  <disabled>{disabled}</disabled>
+  <blockBuildWhenDownstreamBuilding>false</blockBuildWhenDownstreamBuilding>
+  <blockBuildWhenUpstreamBuilding>false</blockBuildWhenUpstreamBuilding>
+  <triggers/>
+  <concurrentBuild>false</concurrentBuild>
+  <builders/>
+  <publishers/>
+  <buildWrappers/>
+</project>'''
+
+folder_config_template = u'''\
+<?xml version='1.1' encoding='UTF-8'?>
+<com.cloudbees.hudson.plugins.folder.Folder>
+  <actions/>
+  <description>{description}</description>
+  <properties/>
+  <views/>
+</com.cloudbees.hudson.plugins.folder.Folder>'''
+
+view_config_template = u'''\
+<?xml version="1.1" encoding="UTF-8"?>
+<hudson.model.ListView>
+  <name>{name}</name>
+  <filterExecutors>false</filterExecutors>
+  <filterQueue>false</filterQueue>
+  <properties class="hudson.model.View$PropertyList"/>
+  <jobNames>
+    <comparator class="hudson.util.CaseInsensitiveComparator"/>
+{jobnames}
+  </jobNames>
+  <jobFilters/>
+  <columns/>
+  <recurse>false</recurse>
+</hudson.model.ListView>'''
+
+node_config_template = u'''\
+<?xml version="1.1" encoding="UTF-8"?>
+<slave>
+  <name>{name}</name>
+  <description>{description}</description>
+  <remoteFS>{remotefs}</remoteFS>
+  <numExecutors>{executors}</numExecutors>
+  <mode>NORMAL</mode>
+  <retentionStrategy class="hudson.slaves.RetentionStrategy$Always"/>
+  <launcher class="hudson.slaves.JNLPLauncher"/>
+  <label>{labels}</label>
+  <nodeProperties/>
+</slave>'''
+
+
+#-----------------------------------------------------------------------------
+# The ``tree`` query parameter of the remote access api.
+re_tree_name = re.compile(r'\s*([A-Za-z_$][\w$]*)\s*')
+
+def parse_tree(spec):
+    '''
+    Parse a tree projection into a dictionary that maps field names to a
+    ``(subtree, span)`` pair - ``'jobs[name]{0,10}'`` becomes
+    ``{'jobs': ({'name': ({}, None)}, (0, 10))}``.
+    '''
+    fields, pos = _parse_tree(spec, 0)
+    if pos != len(spec):
+        raise ValueError('invalid tree: %r' % spec)
+    return fields
+
+def _parse_tree(spec, pos):
+    fields = {}
+    while True:
+        m = re_tree_name.match(spec, pos)
+        if not m:
+            raise ValueError('invalid tree: %r' % spec)
+        name, pos = m.group(1), m.end()
+
+        subtree, span = {}, None
+        if spec.startswith('[', pos):
+            subtree, pos = _parse_tree(spec, pos + 1)
+            if not spec.startswith(']', pos):
+                raise ValueError('invalid tree: %r' % spec)
+            pos += 1
+        if spec.startswith('{', pos):
+            end = spec.index('}', pos)
+            span, pos = parse_span(spec[pos + 1:end]), end + 1
+
+        fields[name] = (subtree, span)
+        if not spec.startswith(',', pos):
+            return fields, pos
+        pos += 1
+
+def parse_span(spec):
+    '''Parse a ``{M,N}``, ``{M,}``, ``{,N}`` or ``{N}`` range into slice bounds.'''
+    if ',' not in spec:
+        return int(spec), int(spec) + 1
+    start, end = spec.split(',', 1)
+    return int(start or 0), int(end) if end.strip() else None
+
+
+def render(value, tree=None, depth=0):
+    '''
+    Serialize a model the way the remote access api does. Without a tree,
+    models nested deeper than ``depth`` are reduced to their summary fields.
+    '''
+    if isinstance(value, list):
+        return [render(i, tree, depth) for i in value]
+    if not isinstance(value, Model):
+        return value
+
+    if tree is not None:
+        names = [i for i in tree if i in value.fields or i in value.extra_fields]
+    elif depth < 0:
+        names = value.summary
+    else:
+        names = value.fields
+
+    res = {'_class': value.klass}
+    for name in names:
+        item, subtree = getattr(value, name), None
+        if tree is not None:
+            subtree, span = tree[name]
+            if span is not None and isinstance(item, list):
+                item = item[span[0]:span[1]]
+        res[name] = render(item, subtree, depth - 1)
+    return res
+
+
+#-----------------------------------------------------------------------------
+Request = namedtuple('Request', 'method path query body headers')
+
+class Response(namedtuple('Response', 'status body headers')):
+    __slots__ = ()
+
+    def __new__(cls, status, body=b'', headers=None):
+        return super(Response, cls).__new__(cls, status, body, headers or {})
+
+
+def parse_config(body):
+    try:
+        return etree.fromstring(body)
+    except etree.ParseError:
+        return None
+
+
+class Model(object):
+    '''An object exposed through the remote access api.'''
+
+    klass = None
+    fields = ()
+    summary = ()
+    extra_fields = ()   # fields that are only available through a tree projection
+
+    def get_api(self, req):
+        try:
+            tree = parse_tree(req.query['tree']) if 'tree' in req.query else None
+            depth = int(req.query.get('depth', 0))
+        except ValueError as error:
+            return Response(400, str(error))
+        return Response(200, render(self, tree, depth))
+
+
+class ItemGroup(object):
+    '''A container of jobs and folders (Jenkins itself or a folder).'''
+
+    def init_items(self):
+        self.items = {}
+        self._sorted = None
+
+    @property
+    def jobs(self):
+        if self._sorted is None:
+            self._sorted = sorted(self.items.values(), key=lambda i: i.name.lower())
+        return self._sorted
+
+    def add_item(self, item):
+        self.items[item.name] = item
+        self._sorted = None
+        return item
+
+    def remove_item(self, item):
+        del self.items[item.name]
+        self._sorted = None
+
+    def post_create_item(self, req):
+        name = req.query.get('name')
+        if not name or name in self.items:
+            return Response(400, 'A job already exists with the name %r' % name)
+
+        if req.query.get('mode') == 'copy':
+            source = self.root.find_item(req.query.get('from', ''))
+            if source is None:
+                return Response(400, 'No such job: %s' % req.query.get('from'))
+            item = source.copy(self, name)
+        else:
+            config = parse_config(req.body)
+            if config is None:
+                return Response(400, 'Invalid config.xml')
+            cls = Folder if config.tag.endswith('Folder') else Job
+            item = cls(self.root, self, name)
+            item.configure(config, req.body)
+
+        self.add_item(item)
+        return Response(200)
+
+
+#-----------------------------------------------------------------------------
+class Item(Model):
+    '''A job or folder.'''
+
+    summary = 'name', 'url', 'color'
+
+    def __init__(self, root, parent, name, description=u''):
+        self.root = root
+        self.parent = parent
+        self.name = name
+        self.description = description
+        self.raw_config = None
+
+    @property
+    def fullName(self):
+        if isinstance(self.parent, Item):
+            return '%s/%s' % (self.parent.fullName, self.name)
+        return self.name
+
+    displayName = property(lambda self: self.name)
+    fullDisplayName = property(lambda self: self.fullName.replace('/', ' » '))
+
+    @property
+    def path(self):
+        return ''.join('job/%s/' % i for i in self.fullName.split('/'))
+
+    @property
+    def url(self):
+        return self.root.url + self.path
+
+    def configure(self, config, raw):
+        self.raw_config = raw
+        self.description = config.findtext('description') or u''
+
+    def get_config(self, req):
+        return Response(200, self.config, {'Content-Type': 'application/xml'})
+
+    def post_config(self, req):
+        config = parse_config(req.body)
+        if config is None:
+            return Response(400, 'Invalid config.xml')
+        self.configure(config, req.body)
+        return Response(200)
+
+    def post_delete(self, req):
+        self.parent.remove_item(self)
+        for view in self.root.viewmap.values():
+            view.discard(self.name)
+        return Response(200)
+
+
+class Folder(ItemGroup, Item):
+    klass = 'com.cloudbees.hudson.plugins.folder.Folder'
+    fields = 'description', 'displayName', 'fullDisplayName', 'fullName', 'name', 'url', 'jobs'
+    summary = 'name', 'url'
+
+    def __init__(self, *args, **kw):
+        super(Folder, self).__init__(*args, **kw)
+        self.init_items()
+
+    @property
+    def config(self):
+        if self.raw_config is not None:
+            return self.raw_config
+        return folder_config_template.format(description=escape(self.description))
+
+    def copy(self, parent, name):
+        folder = Folder(self.root, parent, name, self.description)
+        folder.raw_config = self.raw_config
+        return folder
+
+
+class Job(Item):
+    klass = 'hudson.model.FreeStyleProject'
+    fields = (
+        'description', 'displayName', 'fullDisplayName', 'fullName', 'name', 'url',
+        'buildable', 'builds', 'color', 'disabled', 'firstBuild', 'inQueue', 'keepDependencies',
+        'lastBuild', 'lastCompletedBuild', 'lastFailedBuild', 'lastStableBuild',
+        'lastSuccessfulBuild', 'lastUnstableBuild', 'lastUnsuccessfulBuild',
+        'nextBuildNumber', 'queueItem', 'concurrentBuild',
+    )
+    extra_fields = ('allBuilds',)
+    keepDependencies = concurrentBuild = False
+
+    # Build pointers and the results that they select.
+    pointers = {
+        'lastBuild': None,
+        'lastCompletedBuild': ('SUCCESS', 'UNSTABLE', 'FAILURE', 'ABORTED'),
+        'lastSuccessfulBuild': ('SUCCESS', 'UNSTABLE'),
+        'lastStableBuild': ('SUCCESS',),
+        'lastFailedBuild': ('FAILURE',),
+        'lastUnstableBuild': ('UNSTABLE',),
+        'lastUnsuccessfulBuild': ('UNSTABLE', 'FAILURE', 'ABORTED'),
+    }
+
+    colors = {'SUCCESS': 'blue', 'UNSTABLE': 'yellow', 'FAILURE': 'red', 'ABORTED': 'aborted'}
+
+    def __init__(self, root, parent, name, description=u'', disabled=False, history=0):
+        super(Job, self).__init__(root, parent, name, description)
+        self.disabled = disabled
+        self.history = history   # number of synthesized builds
+        self.records = {}        # builds triggered through the api
+
+    def configure(self, config, raw):
+        super(Job, self).configure(config, raw)
+        self.disabled = config.findtext('disabled') == 'true'
+
+    @property
+    def config(self):
+        disabled = 'true' if self.disabled else 'false'
+        if self.raw_config is None:
+            return job_config_template.format(description=escape(self.description), disabled=disabled)
+        config = self.raw_config.decode('utf8') if isinstance(self.raw_config, bytes) else self.raw_config
+        return re.sub('<disabled>[^<]*</disabled>', '<disabled>%s</disabled>' % disabled, config)
+
+    def copy(self, parent, name):
+        job = Job(self.root, parent, name, self.description, self.disabled)
+        job.raw_config = self.raw_config
+        return job
+
+    #-------------------------------------------------------------------------
+    @property
+    def last_number(self):
+        return max(self.records) if self.records else self.history
+
+    def get_build(self, number):
+        if number in self.records:
+            return self.records[number]
+        if 0 < number <= self.history:
+            return Build.synthesize(self, number)
+        return None
+
+    def iter_builds(self):
+        for number in range(self.last_number, 0, -1):
+            build = self.get_build(number)
+            if build is not None:
+                yield build
+
+    def pointer(self, name):
+        results = self.pointers[name]
+        for build in self.iter_builds():
+            if results is None or build.result in results:
+                return build
+
+    allBuilds = property(lambda self: list(self.iter_builds()))
+    builds = property(lambda self: self.allBuilds[:100])
+    firstBuild = property(lambda self: self.get_build(1))
+    nextBuildNumber = property(lambda self: self.last_number + 1)
+    buildable = property(lambda self: not self.disabled)
+    queueItem = property(lambda self: self.root.waiting_item(self))
+    inQueue = property(lambda self: self.queueItem is not None)
+
+    lastBuild = property(lambda self: self.pointer('lastBuild'))
+    lastCompletedBuild = property(lambda self: self.pointer('lastCompletedBuild'))
+    lastSuccessfulBuild = property(lambda self: self.pointer('lastSuccessfulBuild'))
+    lastStableBuild = property(lambda self: self.pointer('lastStableBuild'))
+    lastFailedBuild = property(lambda self: self.pointer('lastFailedBuild'))
+    lastUnstableBuild = property(lambda self: self.pointer('lastUnstableBuild'))
+    lastUnsuccessfulBuild = property(lambda self: self.pointer('lastUnsuccessfulBuild'))
+
+    @property
+    def color(self):
+        if self.disabled:
+            return 'disabled'
+        completed = self.lastCompletedBuild
+        color = self.colors[completed.result] if completed else 'notbuilt'
+        last = self.lastBuild
+        return color + '_anime' if last and last.building else color
+
+    #-------------------------------------------------------------------------
+    def post_enable(self, req):
+        self.disabled = False
+        return Response(200)
+
+    def post_disable(self, req):
+        self.disabled = True
+        return Response(200)
+
+    def post_build(self, req):
+        if self.disabled:
+            return Response(409, 'Job is disabled')
+        params = dict((k, v) for k, v in req.query.items() if k not in ('token', 'delay'))
+        item = self.root.enqueue(self, params)
+        return Response(201, headers={'Location': self.root.url + item.url})
+
+
+class Build(Model):
+    klass = 'hudson.model.FreeStyleBuild'
+    fields = (
+        'building', 'description', 'displayName', 'duration', 'estimatedDuration',
+        'fullDisplayName', 'id', 'number', 'queueId', 'result', 'timestamp', 'url',
+    )
+    summary = 'number', 'url'
+    description = None
+
+    def __init__(self, job, number, started, length, outcome='SUCCESS', queue_id=0):
+        self.job = job
+        self.number = number
+        self.started = started
+        self.length = length
+        self.outcome = outcome
+        self.queueId = queue_id
+        self.stopped = False
+
+    @classmethod
+    def synthesize(cls, job, number):
+        # A deterministic, mostly successful history that ended an hour ago.
+        outcomes = ('SUCCESS',) * 7 + ('FAILURE', 'UNSTABLE', 'ABORTED')
+        seed = zlib.crc32(('%s#%d' % (job.fullName, number)).encode('utf8'))
+        started = job.root.epoch - (job.history - number + 1) * 3600
+        return cls(job, number, started, 60 + seed % 600, outcomes[seed % len(outcomes)])
+
+    @property
+    def building(self):
+        return not self.stopped and time.time() < self.started + self.length
+
+    @property
+    def result(self):
+        if self.building:
+            return None
+        return 'ABORTED' if self.stopped else self.outcome
+
+    id = property(lambda self: str(self.number))
+    url = property(lambda self: '%s%d/' % (self.job.url, self.number))
+    displayName = property(lambda self: '#%d' % self.number)
+    fullDisplayName = property(lambda self: '%s #%d' % (self.job.fullDisplayName, self.number))
+    timestamp = property(lambda self: int(self.started * 1000))
+    estimatedDuration = property(lambda self: int(self.length * 1000))
+    duration = property(lambda self: 0 if self.building else int(self.length * 1000))
+
+    @property
+    def log(self):
+        header = u'Started by user anonymous\nBuilding in workspace /var/lib/jenkins/workspace/%s\n'
+        header %= self.job.fullName
+        lines = self.job.root.log_lines
+        if self.building:
+            lines = int(lines * (time.time() - self.started) / self.length)
+        body = u''.join(u'[%s #%d] log line %d\n' % (self.job.name, self.number, i) for i in range(lines))
+        footer = u'' if self.building else u'Finished: %s\n' % self.result
+        return (header + body + footer).encode('utf8')
+
+    def get_progressive_text(self, req):
+        log = self.log
+        start = int(req.query.get('start', 0))
+        headers = {'Content-Type': 'text/plain;charset=UTF-8', 'X-Text-Size': str(len(log))}
+        if self.building:
+            headers['X-More-Data'] = 'true'
+        return Response(200, log[start:], headers)
+
+    def get_console_text(self, req):
+        return Response(200, self.log, {'Content-Type': 'text/plain;charset=UTF-8'})
+
+    def post_stop(self, req):
+        if self.building:
+            self.stopped = True
+            self.length = time.time() - self.started
+        return Response(200)
+
+
+#-----------------------------------------------------------------------------
+def format_params(params):
+    return ''.join('\n%s=%s' % i for i in sorted(params.items()))
+
+
+class QueueItem(Model):
+    fields = (
+        'blocked', 'buildable', 'id', 'inQueueSince', 'params', 'stuck',
+        'task', 'url', 'why', 'cancelled', 'executable',
+    )
+    summary = fields
+    blocked = stuck = False
+
+    def __init__(self, root, id, job, params, start_at):
+        self.root = root
+        self.id = id
+        self.task = job
+        self.params = format_params(params)
+        self.start_at = start_at
+        self.inQueueSince = int(time.time() * 1000)
+        self.executable = None
+        self.cancelled = False
+
+    @property
+    def klass(self):
+        return 'hudson.model.Queue$WaitingItem' if self.waiting else 'hudson.model.Queue$LeftItem'
+
+    waiting = property(lambda self: self.executable is None and not self.cancelled)
+    buildable = property(lambda self: self.waiting)
+    why = property(lambda self: 'Waiting for next available executor' if self.waiting else None)
+    url = property(lambda self: 'queue/item/%d/' % self.id)
+
+
+class Queue(Model):
+    klass = 'hudson.model.Queue'
+    fields = ('items',)
+
+    def __init__(self, root):
+        self.root = root
+
+    @property
+    def items(self):
+        return [i for i in self.root.queue.values() if i.waiting]
+
+    def post_cancel_item(self, req):
+        item = self.root.queue.get(int(req.query.get('id', 0)))
+        if item is None:
+            return Response(404)
+        if item.waiting:
+            item.cancelled = True
+        return Response(200)
+
+
+#-----------------------------------------------------------------------------
+class View(Model):
+    fields = 'description', 'jobs', 'name', 'url'
+    summary = 'name', 'url'
+    description = None
+
+    def __init__(self, root, name, jobnames=None):
+        self.root = root
+        self.name = name
+        self.jobnames = jobnames   # None for a view of all jobs
+
+    @property
+    def klass(self):
+        return 'hudson.model.AllView' if self.jobnames is None else 'hudson.model.ListView'
+
+    @property
+    def url(self):
+        return '%sview/%s/' % (self.root.url, self.name)
+
+    @property
+    def jobs(self):
+        if self.jobnames is None:
+            return self.root.jobs
+        return [i for i in self.root.jobs if i.name in self.jobnames]
+
+    def discard(self, name):
+        if self.jobnames is not None:
+            self.jobnames.discard(name)
+
+    def configure(self, config):
+        self.jobnames = set(i.text for i in config.findall('jobNames/string'))
+
+    @property
+    def config(self):
+        jobnames = sorted(self.jobnames or (), key=str.lower)
+        jobnames = '\n'.join('    <string>%s</string>' % escape(i) for i in jobnames)
+        return view_config_template.format(name=escape(self.name), jobnames=jobnames)
+
+    def get_config(self, req):
+        return Response(200, self.config, {'Content-Type': 'application/xml'})
+
+    def post_config(self, req):
+        config = parse_config(req.body)
+        if config is None or self.jobnames is None:
+            return Response(400, 'Invalid config.xml')
+        self.configure(config)
+        return Response(200)
+
+    def post_delete(self, req):
+        if self.jobnames is None:
+            return Response(400, 'Cannot delete the primary view')
+        del self.root.viewmap[self.name]
+        return Response(200)
+
+    def _post_membership(self, req, add):
+        name = req.query.get('name')
+        if name not in self.root.items:
+            return Response(400, 'Query parameter name does not correspond to a known item')
+        if self.jobnames is not None:
+            self.jobnames.add(name) if add else self.jobnames.discard(name)
+        return Response(200)
+
+    def post_add_job(self, req):
+        return self._post_membership(req, True)
+
+    def post_remove_job(self, req):
+        return self._post_membership(req, False)
+
+
+#-----------------------------------------------------------------------------
+class Computer(Model):
+    fields = (
+        'description', 'displayName', 'idle', 'jnlpAgent', 'numExecutors',
+        'offline', 'offlineCauseReason', 'temporarilyOffline',
+    )
+    summary = fields
+    idle = True
+    temporarilyOffline = False
+    offlineCauseReason = ''
+
+    def __init__(self, root, name, description=u'', remotefs=u'/var/lib/jenkins',
+                 executors=1, labels=u'', master=False):
+        self.root = root
+        self.name = name
+        self.description = description
+        self.remotefs = remotefs
+        self.numExecutors = executors
+        self.labels = labels
+        self.master = master
+
+    displayName = property(lambda self: self.name)
+    offline = property(lambda self: not self.master)
+    jnlpAgent = property(lambda self: not self.master)
+
+    @property
+    def klass(self):
+        return 'hudson.model.Hudson$MasterComputer' if self.master else 'hudson.slaves.SlaveComputer'
+
+    @property
+    def config(self):
+        return node_config_template.format(
+            name=escape(self.name), description=escape(self.description),
+            remotefs=escape(self.remotefs), executors=self.numExecutors, labels=escape(self.labels))
+
+    def get_config(self, req):
+        return Response(200, self.config, {'Content-Type': 'application/xml'})
+
+    def post_config(self, req):
+        config = parse_config(req.body)
+        if config is None or self.master:
+            return Response(400, 'Invalid config.xml')
+        self.description = config.findtext('description') or u''
+        self.remotefs = config.findtext('remoteFS') or u''
+        self.numExecutors = int(config.findtext('numExecutors') or 1)
+        self.labels = config.findtext('label') or u''
+        return Response(200)
+
+    def post_delete(self, req):
+        if self.master:
+            return Response(400, 'Cannot delete the master node')
+        del self.root.nodes[self.name]
+        return Response(200)
+
+
+class ComputerSet(Model):
+    klass = 'hudson.model.ComputerSet'
+    fields = 'busyExecutors', 'computer', 'displayName', 'totalExecutors'
+    busyExecutors = 0
+    displayName = 'Nodes'
+
+    def __init__(self, root):
+        self.root = root
+
+    @property
+    def computer(self):
+        nodes = self.root.nodes
+        return [nodes['master']] + [nodes[i] for i in sorted(nodes) if i != 'master']
+
+    @property
+    def totalExecutors(self):
+        return sum(i.numExecutors for i in self.root.nodes.values() if not i.offline)
+
+    def post_create_node(self, req):
+        name = req.query.get('name')
+        if not name or name in self.root.nodes:
+            return Response(400, 'Agent called %r already exists' % name)
+        try:
+            form = json.loads(req.query.get('json', '{}'))
+            executors = int(form.get('numExecutors', 1))
+        except ValueError:
+            return Response(400, 'Invalid form data')
+        self.root.nodes[name] = Computer(
+            self.root, name, form.get('nodeDescription') or u'', form.get('remoteFS') or u'',
+            executors, form.get('labelString') or u'')
+        return Response(200)
+
+
+class CrumbIssuer(Model):
+    klass = 'hudson.security.csrf.DefaultCrumbIssuer'
+    fields = 'crumb', 'crumbRequestField'
+    crumbRequestField = 'Jenkins-Crumb'
+
+    def __init__(self, root):
+        self.root = root
+
+    crumb = property(lambda self: self.root.crumb)
+
+
+#-----------------------------------------------------------------------------
+class FakeJenkins(ItemGroup, Model):
+    '''
+    A threaded http server that behaves like a Jenkins master.
+
+    :param latency: seconds to wait before every response, or a callable
+                    that receives a :class:`Request` and returns the delay
+    :param csrf: require a crumb in POST requests
+    :param queue_delay: seconds that triggered builds wait in the queue
+    :param build_duration: seconds that triggered builds run for
+    :param log_lines: number of lines in the console log of a build
+    '''
+
+    klass = 'hudson.model.Hudson'
+    fields = (
+        'mode', 'nodeDescription', 'nodeName', 'numExecutors', 'description',
+        'jobs', 'primaryView', 'quietingDown', 'slaveAgentPort', 'url',
+        'useCrumbs', 'useSecurity', 'views',
+    )
+    mode = 'NORMAL'
+    nodeDescription = 'the master Jenkins node'
+    nodeName = ''
+    numExecutors = 2
+    description = None
+    quietingDown = False
+    slaveAgentPort = -1
+    useSecurity = True
+
+    # Action path suffixes and the handler method suffixes that serve them.
+    actions = {
+        'api/json': 'api',
+        'config.xml': 'config',
+        'createItem': 'create_item',
+        'createView': 'create_view',
+        'doDelete': 'delete',
+        'enable': 'enable',
+        'disable': 'disable',
+        'build': 'build',
+        'buildWithParameters': 'build',
+        'stop': 'stop',
+        'addJobToView': 'add_job',
+        'removeJobFromView': 'remove_job',
+        'doCreateItem': 'create_node',
+        'cancelItem': 'cancel_item',
+        'logText/progressiveText': 'progressive_text',
+        'consoleText': 'console_text',
+    }
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, csrf=True,
+                 queue_delay=0, build_duration=0, log_lines=10):
+        self.latency = latency
+        self.csrf = csrf
+        self.queue_delay = queue_delay
+        self.build_duration = build_duration
+        self.log_lines = log_lines
+
+        self.root = self
+        self.epoch = time.time()
+        self.lock = threading.RLock()
+        self.init_items()
+        self.viewmap = {'all': View(self, 'all')}
+        self.nodes = {'master': Computer(self, 'master', executors=self.numExecutors, master=True)}
+        self.queue = {}
+        self.queue_model = Queue(self)
+        self.computer_set = ComputerSet(self)
+        self.crumb_issuer = CrumbIssuer(self)
+        self.rotate_crumb()
+        self.reset_stats()
+
+        self.httpd = _HTTPServer((host, port), _Handler)
+        self.httpd.fake = self
+        self.url = 'http://%s:%d/' % self.httpd.server_address[:2]
+        self.thread = None
+
+    #-------------------------------------------------------------------------
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def reset_stats(self):
+        '''Forget the requests that were served so far.'''
+        with self.lock:
+            self.requests = []
+            self.bytes_sent = 0
+            self.bytes_received = 0
+
+    def rotate_crumb(self):
+        '''Issue a new crumb, as Jenkins does when a session expires.'''
+        self.crumb = '%032x' % random.getrandbits(128)
+
+    #-------------------------------------------------------------------------
+    def add_job(self, fullname, description=u'', disabled=False, builds=0):
+        '''Add a job with ``builds`` synthesized builds (parent folders are created).'''
+        parent, _, name = fullname.rpartition('/')
+        group = self.folder(parent)
+        return group.add_item(Job(self, group, name, description, disabled, builds))
+
+    def folder(self, fullname):
+        '''Get a folder by its full name, creating any missing folders.'''
+        group = self
+        for name in filter(None, fullname.split('/')):
+            if name not in group.items:
+                group.add_item(Folder(self, group, name))
+            group = group.items[name]
+        return group
+
+    def add_view(self, name, jobnames=()):
+        self.viewmap[name] = View(self, name, set(jobnames))
+        return self.viewmap[name]
+
+    def add_node(self, name, **kw):
+        self.nodes[name] = Computer(self, name, **kw)
+        return self.nodes[name]
+
+    def populate(self, jobs=0, builds=0, views=0, nodes=0, disabled=0.0, folder='', prefix='job-'):
+        '''
+        Synthesize an inventory. Jobs are spread round-robin over the views
+        and a ``disabled`` fraction of them is disabled.
+        '''
+        with self.lock:
+            width = len(str(jobs))
+            group = self.folder(folder)
+            viewnames = [self.add_view('view-%d' % i).jobnames for i in range(views)]
+            for i in range(jobs):
+                name = '%s%0*d' % (prefix, width, i)
+                off = zlib.crc32(name.encode('utf8')) % 1000 < disabled * 1000
+                group.add_item(Job(self, group, name, disabled=off, history=builds))
+                if viewnames and group is self:
+                    viewnames[i % views].add(name)
+            for i in range(nodes):
+                self.add_node('node-%d' % i)
+        return self
+
+    def find_item(self, fullname):
+        item = self
+        for name in filter(None, fullname.split('/')):
+            item = getattr(item, 'items', {}).get(name)
+            if item is None:
+                return None
+        return item
+
+    #-------------------------------------------------------------------------
+    def enqueue(self, job, params):
+        # Like Jenkins, a waiting item absorbs identical build requests.
+        item = self.waiting_item(job)
+        if item is not None and item.params == format_params(params):
+            return item
+        id = len(self.queue) + 1
+        self.queue[id] = item = QueueItem(self, id, job, params, time.time() + self.queue_delay)
+        return item
+
+    def waiting_item(self, job):
+        for item in self.queue.values():
+            if item.waiting and item.task is job:
+                return item
+
+    def tick(self):
+        '''Start the builds of queue items whose time has come.'''
+        now = time.time()
+        for item in sorted(self.queue.values(), key=lambda i: i.start_at):
+            if item.waiting and item.start_at <= now:
+                job = item.task
+                number = job.last_number + 1
+                job.records[number] = Build(job, number, now, self.build_duration, queue_id=item.id)
+                item.executable = job.records[number]
+
+    #-------------------------------------------------------------------------
+    useCrumbs = property(lambda self: self.csrf)
+    primaryView = property(lambda self: self.viewmap['all'])
+    views = property(lambda self: [self.viewmap[i] for i in sorted(self.viewmap)])
+
+    def post_create_view(self, req):
+        name = req.query.get('name')
+        if not name or name in self.viewmap:
+            return Response(400, 'A view already exists with the name %r' % name)
+        config = parse_config(req.body) if req.body else None
+        view = View(self, name, set())
+        if config is not None:
+            view.configure(config)
+        self.viewmap[name] = view
+        return Response(200)
+
+    def resolve(self, parts):
+        '''Walk the url path segments to the addressed object and action.'''
+        obj, pos = self, 0
+        while pos < len(parts):
+            part = parts[pos]
+            nxt = parts[pos + 1] if pos + 1 < len(parts) else None
+            if part == 'job' and nxt is not None and isinstance(obj, (ItemGroup, View)):
+                obj = (obj if isinstance(obj, ItemGroup) else self).items.get(nxt)
+                pos += 2
+            elif part == 'view' and nxt is not None and obj is self:
+                obj = self.viewmap.get(nxt)
+                pos += 2
+            elif part == 'computer' and obj is self:
+                obj = self.computer_set
+                pos += 1
+            elif obj is self.computer_set and part not in ('api', 'doCreateItem'):
+                obj = self.nodes.get('master' if part == '(master)' else part)
+                pos += 1
+            elif part == 'queue' and obj is self:
+                obj = self.queue_model
+                pos += 1
+            elif part == 'item' and obj is self.queue_model and nxt and nxt.isdigit():
+                obj = self.queue.get(int(nxt))
+                pos += 2
+            elif part == 'crumbIssuer' and obj is self:
+                obj = self.crumb_issuer
+                pos += 1
+            elif isinstance(obj, Job) and part.isdigit():
+                obj = obj.get_build(int(part))
+                pos += 1
+            elif isinstance(obj, Job) and part in Job.pointers:
+                obj = obj.pointer(part)
+                pos += 1
+            else:
+                break
+
+            if obj is None:
+                return None, None
+        return obj, '/'.join(parts[pos:])
+
+    def dispatch(self, req):
+        if req.method == 'GET' and req.path.strip('/') == 'crumbIssuer/api/json' and not self.csrf:
+            return Response(404)
+
+        if req.method == 'POST' and self.csrf and req.headers.get('Jenkins-Crumb') != self.crumb:
+            return Response(403, 'No valid crumb was included in the request')
+
+        parts = [unquote(i) for i in req.path.strip('/').split('/') if i]
+        with self.lock:
+            self.tick()
+            obj, action = self.resolve(parts)
+            handler = getattr(obj, '%s_%s' % (req.method.lower(), self.actions.get(action)), None)
+            if handler is None:
+                return Response(404)
+            return handler(req)
+
+
+#-----------------------------------------------------------------------------
+class _HTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def handle_request(self, method):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        url = urlsplit(self.path)
+        req = Request(method, url.path, dict(parse_qsl(url.query, True)), body, self.headers)
+
+        latency = fake.latency(req) if callable(fake.latency) else fake.latency
+        if latency:
+            time.sleep(latency)
+
+        res = fake.dispatch(req)
+        content = res.body
+        if not isinstance(content, (bytes, type(u''))):
+            content = json.dumps(content, separators=(',', ':'))
+        if not isinstance(content, bytes):
+            content = content.encode('utf8')
+
+        with fake.lock:
+            fake.requests.append((method, url.path))
+            fake.bytes_received += len(body)
+            fake.bytes_sent += len(content)
+
+        self.send_response(res.status)
+        headers = {'Content-Type': 'application/json;charset=utf-8'}
+        headers.update(res.headers)
+        headers['Content-Length'] = str(len(content))
+        if method == 'GET' and url.path.strip('/') == 'crumbIssuer/api/json':
+            headers['Set-Cookie'] = 'JSESSIONID.fake=%s; Path=/' % fake.crumb[:16]
+        for name, value in sorted(headers.items()):
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
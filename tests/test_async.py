@@ -0,0 +1,140 @@
+# -*- coding: utf-8; -*-
+
+import re
+import sys
+import json
+import threading
+
+import pytest
+
+if sys.version_info < (3, 7):
+    pytest.skip('requires ThreadingHTTPServer (Python >= 3.7)', allow_module_level=True)
+
+aiohttp = pytest.importorskip('aiohttp')
+asyncio = pytest.importorskip('asyncio')
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# local imports
+from jenkins import JenkinsError
+from jenkins_async import AsyncJenkins, AsyncJob, AsyncBuild
+
+
+#-----------------------------------------------------------------------------
+# A tiny stand-in for Jenkins that knows about a fixed set of jobs.
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    jobs = ['job-%d' % i for i in range(50)]
+    polls = []
+    posts = []
+    log = b'one\ntwo\nthree\n'
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, code, body=b'', ctype='application/json'):
+        self.send_response(code)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/crumbIssuer/api/json':
+            body = {'crumbRequestField': 'Jenkins-Crumb', 'crumb': 'abc'}
+            return self.reply(200, json.dumps(body).encode())
+
+        if path == '/api/json':
+            body = {'jobs': [{'name': i} for i in sorted(self.jobs)]}
+            return self.reply(200, json.dumps(body).encode())
+
+        if path.endswith('/logText/progressiveText'):
+            start = int(self.path.split('start=')[1])
+            end = min(start + 4, len(self.log))
+            self.send_response(200)
+            self.send_header('Content-Length', str(end - start))
+            self.send_header('X-Text-Size', str(end))
+            if end < len(self.log):
+                self.send_header('X-More-Data', 'true')
+            self.end_headers()
+            return self.wfile.write(self.log[start:end])
+
+        m = re.match(r'^/job/([^/]+)/(\d+)/api/json$', path)
+        if m and m.group(1) in self.jobs:
+            self.polls.append(m.group(1))
+            building = len(self.polls) < 3
+            body = {'building': building, 'result': None if building else 'SUCCESS'}
+            return self.reply(200, json.dumps(body).encode())
+
+        m = re.match(r'^/job/([^/]+)/api/json$', path)
+        if m and m.group(1) in self.jobs:
+            return self.reply(200, json.dumps({'name': m.group(1)}).encode())
+
+        self.reply(404)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.posts.append((self.path, self.headers.get('Jenkins-Crumb')))
+        self.reply(200)
+
+
+@pytest.fixture(scope='module')
+def url():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:%d' % httpd.server_address[1]
+    httpd.shutdown()
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+#-----------------------------------------------------------------------------
+def test_async_gather(url):
+    async def main():
+        async with AsyncJenkins(url, limit=8) as api:
+            names = await api.jobnames
+            jobs = await api.jobs
+            found = await asyncio.gather(*(api.job_exists(i) for i in names * 4))
+            missing = await api.job_exists('does-not-exist')
+            return names, jobs, found, missing
+
+    names, jobs, found, missing = run(main())
+    assert len(names) == 50
+    assert all(isinstance(i, AsyncJob) for i in jobs)
+    assert all(found) and len(found) == 200
+    assert missing is False
+
+def test_async_post_and_wait(url):
+    async def main():
+        async with AsyncJenkins(url) as api:
+            await api.job_disable('job-1')
+            with pytest.raises(JenkinsError):
+                await api.job_enable('does-not-exist')
+
+            build = api.build('job-1', 1)
+            assert isinstance(build, AsyncBuild)
+            return await build.wait(tick=0.01)
+
+    assert run(main()) == 'SUCCESS'
+    assert Handler.posts == [('/job/job-1/disable', 'abc')]
+
+def test_async_no_sync_usage(url):
+    api = AsyncJenkins(url)
+    with pytest.raises(TypeError):
+        'job-1' in api.view('all')
+    with pytest.raises(AttributeError):
+        api.job('job-1').config = '<project/>'
+
+def test_async_iter_console(url):
+    async def main():
+        async with AsyncJenkins(url) as api:
+            build = api.build('job-1', 1)
+            return [line async for line in build.iter_console(tick=0)]
+
+    assert run(main()) == ['one', 'two', 'three']
@@ -0,0 +1,320 @@
+# -*- coding: utf-8; -*-
+
+'''
+Request budgets of the Jenkins facade. Every facade method is run against
+the fake Jenkins server and fails if it needs more round trips than its
+budget. Wall time and transferred bytes are reported with ``-s``:
+
+    py.test -s tests/test_benchmark.py --bench-sizes=100,10000,50000
+'''
+
+from __future__ import print_function
+
+import time
+import pytest
+import lxml.etree
+
+from collections import OrderedDict
+
+# local imports
+from jenkins import Jenkins
+from . fakejenkins import FakeJenkins
+from . utils import job_config, view_config
+
+
+#-----------------------------------------------------------------------------
+# Benchmark cases: the name of the facade method, its request budget and a
+# function that prepares the fake server and returns the call to measure.
+cases = OrderedDict()
+
+def case(name, budget):
+    def decorator(setup):
+        cases[name] = (budget, setup)
+        return setup
+    return decorator
+
+def add_view(fake, name):
+    return fake.add_view(name, [fake.first])
+
+
+@case('jobnames', 1)
+def _(fake):
+    return lambda j: j.jobnames
+
+@case('jobs', 1)
+def _(fake):
+    return lambda j: j.jobs
+
+@case('jobs_enabled', 1)
+def _(fake):
+    return lambda j: j.jobs_enabled()
+
+@case('jobs_build_pointers', 1)
+def _(fake):
+    return lambda j: j.jobs_build_pointers()
+
+@case('viewnames', 1)
+def _(fake):
+    return lambda j: j.viewnames
+
+@case('nodenames', 1)
+def _(fake):
+    return lambda j: j.nodenames
+
+#-----------------------------------------------------------------------------
+@case('job_summaries', 1)
+def _(fake):
+    return lambda j: j.job_summaries()
+
+@case('job_info', 1)
+def _(fake):
+    return lambda j: j.job_info(fake.first)
+
+@case('job_exists', 1)
+def _(fake):
+    return lambda j: j.job_exists(fake.first)
+
+@case('job_enabled', 1)
+def _(fake):
+    return lambda j: j.job_enabled(fake.first)
+
+@case('job_config', 1)
+def _(fake):
+    return lambda j: j.job_config(fake.first)
+
+@case('job_config_etree', 1)
+def _(fake):
+    return lambda j: j.job_config_etree(fake.first)
+
+@case('job_create', 2)
+def _(fake):
+    return lambda j: j.job_create('bench-create', job_config)
+
+@case('job_copy', 4)
+def _(fake):
+    return lambda j: j.job_copy(fake.first, 'bench-copy')
+
+@case('job_delete', 3)
+def _(fake):
+    fake.add_job('bench-delete')
+    return lambda j: j.job_delete('bench-delete')
+
+@case('job_enable', 2)
+def _(fake):
+    return lambda j: j.job_enable(fake.first)
+
+@case('job_disable', 2)
+def _(fake):
+    fake.add_job('bench-disable')
+    return lambda j: j.job_disable('bench-disable')
+
+@case('job_reconfigure', 2)
+def _(fake):
+    fake.add_job('bench-reconfigure')
+    return lambda j: j.job_reconfigure('bench-reconfigure', job_config)
+
+@case('job_reconfigure_etree', 2)
+def _(fake):
+    fake.add_job('bench-reconfigure-etree')
+    config = lxml.etree.fromstring(job_config.encode('utf8'))
+    return lambda j: j.job_reconfigure_etree('bench-reconfigure-etree', config)
+
+@case('reconfigure_many', 3)
+def _(fake):
+    fake.add_job('bench-reconfigure-many')
+    configs = {fake.first: fake.items[fake.first].config, 'bench-reconfigure-many': job_config}
+    return lambda j: j.reconfigure_many(configs)
+
+@case('job_build', 2)
+def _(fake):
+    fake.add_job('bench-build')
+    return lambda j: j.job_build('bench-build')
+
+@case('job_builds', 1)
+def _(fake):
+    return lambda j: j.job_builds(fake.first)
+
+@case('job_iter_builds', 1)
+def _(fake):
+    return lambda j: list(j.job_iter_builds(fake.first))
+
+@case('job_last_build', 1)
+def _(fake):
+    return lambda j: j.job_last_build(fake.first)
+
+@case('job_last_stable_build', 1)
+def _(fake):
+    return lambda j: j.job_last_stable_build(fake.first)
+
+@case('job_last_successful_build', 1)
+def _(fake):
+    return lambda j: j.job_last_successful_build(fake.first)
+
+@case('job_build_pointers', 1)
+def _(fake):
+    return lambda j: j.job_build_pointers(fake.first)
+
+#-----------------------------------------------------------------------------
+@case('build_info', 1)
+def _(fake):
+    return lambda j: j.build_info(fake.first, 1)
+
+@case('build_isbuilding', 1)
+def _(fake):
+    return lambda j: j.build_isbuilding(fake.first, 1)
+
+@case('build_stop', 1)
+def _(fake):
+    return lambda j: j.build_stop(fake.first, 1)
+
+@case('build_wait', 1)
+def _(fake):
+    return lambda j: j.build_wait(fake.first, 1)
+
+@case('build_iter_console', 1)
+def _(fake):
+    return lambda j: list(j.build_iter_console(fake.first, 1))
+
+@case('queue_resolve', 3)
+def _(fake):
+    jobs = [fake.add_job('bench-queue-%d' % i) for i in range(2)]
+    items = [fake.enqueue(jobs[i % 2], {'n': str(i)}) for i in range(10)]
+    return lambda j: j.queue_resolve([j.queue_item(i.task.name, i.id) for i in items])
+
+#-----------------------------------------------------------------------------
+@case('view_exists', 1)
+def _(fake):
+    return lambda j: j.view_exists('view-0')
+
+@case('view_jobs', 1)
+def _(fake):
+    return lambda j: j.view_jobs('view-0')
+
+@case('view_jobnames', 1)
+def _(fake):
+    return lambda j: j.view_jobnames('view-0')
+
+@case('view_index', 1)
+def _(fake):
+    return lambda j: j.view_index()
+
+@case('view_config', 1)
+def _(fake):
+    return lambda j: j.view_config('view-0')
+
+@case('view_config_etree', 1)
+def _(fake):
+    return lambda j: j.view_config_etree('view-0')
+
+@case('view_has_job', 1)
+def _(fake):
+    return lambda j: j.view_has_job('view-0', fake.first)
+
+@case('view_create', 2)
+def _(fake):
+    return lambda j: j.view_create('bench-create', view_config)
+
+@case('view_delete', 3)
+def _(fake):
+    add_view(fake, 'bench-delete')
+    return lambda j: j.view_delete('bench-delete')
+
+@case('view_reconfigure', 2)
+def _(fake):
+    add_view(fake, 'bench-reconfigure')
+    return lambda j: j.view_reconfigure('bench-reconfigure', view_config)
+
+@case('view_reconfigure_etree', 2)
+def _(fake):
+    add_view(fake, 'bench-reconfigure-etree')
+    config = lxml.etree.fromstring(view_config.encode('utf8'))
+    return lambda j: j.view_reconfigure_etree('bench-reconfigure-etree', config)
+
+@case('view_add_job', 3)
+def _(fake):
+    add_view(fake, 'bench-add')
+    return lambda j: j.view_add_job('bench-add', fake.first)
+
+@case('view_remove_job', 3)
+def _(fake):
+    add_view(fake, 'bench-remove')
+    return lambda j: j.view_remove_job('bench-remove', fake.first)
+
+#-----------------------------------------------------------------------------
+@case('node_exists', 1)
+def _(fake):
+    return lambda j: j.node_exists('node-0')
+
+@case('node_info', 1)
+def _(fake):
+    return lambda j: j.node_info('node-0')
+
+@case('node_config', 1)
+def _(fake):
+    return lambda j: j.node_config('node-0')
+
+@case('node_config_etree', 1)
+def _(fake):
+    return lambda j: j.node_config_etree('node-0')
+
+@case('node_create', 2)
+def _(fake):
+    return lambda j: j.node_create('bench-create', '/tmp/bench')
+
+@case('node_delete', 3)
+def _(fake):
+    fake.add_node('bench-delete')
+    return lambda j: j.node_delete('bench-delete')
+
+
+#-----------------------------------------------------------------------------
+def bench_sizes(config):
+    return [int(i) for i in config.getoption('--bench-sizes').split(',')]
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        metafunc.parametrize('size', bench_sizes(metafunc.config), scope='module')
+
+@pytest.fixture(scope='module')
+def results():
+    results = []
+    yield results
+
+    print('\n%-28s %8s %8s %10s %12s' % ('method', 'jobs', 'requests', 'bytes', 'seconds'))
+    for name, size, requests, nbytes, elapsed in results:
+        print('%-28s %8d %8d %10d %12.4f' % (name, size, requests, nbytes, elapsed))
+
+@pytest.fixture(scope='module')
+def fake(size):
+    with FakeJenkins() as fake:
+        fake.populate(jobs=size, builds=20, views=5, nodes=3)
+        fake.first = sorted(fake.items)[0]
+        yield fake
+
+@pytest.fixture(scope='module')
+def j(fake):
+    with Jenkins(fake.url) as j:
+        # The crumb is requested once per session - keep it out of the counts.
+        j.server.crumb_header
+        yield j
+
+
+#-----------------------------------------------------------------------------
+def test_all_methods_covered():
+    prefixes = 'job_', 'build_', 'view_', 'node_'
+    methods = set(i for i in dir(Jenkins) if i.startswith(prefixes))
+    assert methods <= set(cases)
+
+@pytest.mark.parametrize('name', list(cases))
+def test_request_budget(name, size, fake, j, results):
+    budget, setup = cases[name]
+    call = setup(fake)
+
+    fake.reset_stats()
+    start = time.time()
+    call(j)
+    elapsed = time.time() - start
+
+    requests = len(fake.requests)
+    results.append((name, size, requests, fake.bytes_sent + fake.bytes_received, elapsed))
+    assert requests <= budget, 'request budget exceeded: %r' % fake.requests
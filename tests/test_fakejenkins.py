@@ -0,0 +1,222 @@
+# -*- coding: utf-8; -*-
+
+import pytest
+
+# local imports
+from jenkins import Jenkins, JenkinsError
+from . fakejenkins import FakeJenkins, parse_tree, render
+
+
+#-----------------------------------------------------------------------------
+@pytest.fixture
+def fake():
+    with FakeJenkins() as fake:
+        yield fake.populate(jobs=20, builds=5, views=2, nodes=1)
+
+@pytest.fixture
+def j(fake):
+    with Jenkins(fake.url) as j:
+        yield j
+
+
+#-----------------------------------------------------------------------------
+def test_parse_tree():
+    assert parse_tree('name') == {'name': ({}, None)}
+    assert parse_tree('jobs[name,builds[number]{0,10}],views[name]') == {
+        'jobs': ({'name': ({}, None), 'builds': ({'number': ({}, None)}, (0, 10))}, None),
+        'views': ({'name': ({}, None)}, None),
+    }
+    assert parse_tree('allBuilds[number]{5,}')['allBuilds'][1] == (5, None)
+    assert parse_tree('allBuilds[number]{3}')['allBuilds'][1] == (3, 4)
+    with pytest.raises(ValueError):
+        parse_tree('jobs[name')
+
+def test_render_depth(fake):
+    job = fake.items['job-00']
+    info = render(job)
+    assert info['lastBuild'] == {'_class': 'hudson.model.FreeStyleBuild', 'number': 5, 'url': job.url + '5/'}
+    assert 'allBuilds' not in info
+    assert render(job, depth=1)['lastBuild']['result'] in ('SUCCESS', 'FAILURE', 'UNSTABLE', 'ABORTED')
+    assert render(job, parse_tree('allBuilds[number]{1,3}')) == {
+        '_class': job.klass,
+        'allBuilds': [{'_class': 'hudson.model.FreeStyleBuild', 'number': i} for i in (4, 3)],
+    }
+
+def test_listings(fake, j):
+    assert len(j.jobnames) == 20
+    assert j.viewnames == ['all', 'view-0', 'view-1']
+    assert j.view('view-0').jobnames == ['job-%02d' % i for i in range(0, 20, 2)]
+    assert j.nodenames == ['(master)', 'node-0']
+    assert [i.number for i in j.job('job-03').builds] == [5, 4, 3, 2, 1]
+    assert j.job_last_build('job-03').number == 5
+
+    fake.reset_stats()
+    assert len(j.job_summaries()) == 20
+    assert fake.requests == [('GET', '/api/json')]
+
+def test_job_lifecycle(fake, j):
+    config = fake.items['job-00'].config
+    j.job_create('new', config)
+    assert j.job_exists('new')
+    assert j.job_enabled('new')
+
+    j.job_disable('new')
+    assert not j.job_enabled('new')
+    assert '<disabled>true</disabled>' in j.job_config('new')
+
+    j.job_copy('new', 'copy')
+    assert j.job_config('copy') == j.job_config('new')
+    with pytest.raises(JenkinsError):
+        j.job_create('copy', config)
+
+    j.view_add_job('view-1', 'copy')
+    assert 'copy' in j.view_jobnames('view-1')
+    assert 'copy' in j.view('view-1')
+
+    j.job_delete('copy')
+    assert not j.job_exists('copy')
+    assert 'copy' not in j.view_jobnames('view-1')
+
+def test_reconfigure_many(fake, j):
+    configs = dict(('job-%02d' % i, fake.items['job-%02d' % i].config) for i in range(10))
+    configs['job-01'] = configs['job-01'].replace('<description>', '<description>changed')
+    configs['job-02'] = configs['job-02'].replace('\n', '\r\n')
+    configs['missing'] = configs['job-00']
+
+    j.server.crumb_header
+    fake.reset_stats()
+    report = j.reconfigure_many(configs, max_workers=4)
+    assert list(report) == list(configs)
+    assert report['job-01'].result == 'changed'
+    assert report['job-02'].result == 'unchanged'
+    assert not report['missing'].ok
+    assert sum(1 for i in report.values() if i.result == 'unchanged') == 9
+
+    assert len(fake.requests) == 12
+    assert [i for i in fake.requests if i[0] == 'POST'] == [('POST', '/job/job-01/config.xml')]
+    assert j.job_config('job-01').startswith(configs['job-01'][:60])
+
+def test_view_index(fake, j):
+    fake.reset_stats()
+    index = j.view_index()
+    assert fake.requests == [('GET', '/api/json')]
+    assert sorted(index.jobs) == ['all', 'view-0', 'view-1']
+    assert index.jobs_of('view-0') == frozenset('job-%02d' % i for i in range(0, 20, 2))
+    assert index.views_of('job-03') == index.views_of(j.job('job-03')) == frozenset(['all', 'view-1'])
+    assert index.views_of('missing') == frozenset()
+
+    j.view_add_job('view-0', 'job-03')
+    j.view_create('view-2', fake.viewmap['view-0'].config.replace('view-0', 'view-2'))
+    assert index.refresh('view-0', 'missing') == set(['view-0'])
+    assert index.views_of('job-03') == frozenset(['all', 'view-0', 'view-1'])
+    assert 'view-2' not in index.jobs
+
+    j.view_delete('view-1')
+    assert index.refresh() == set(['view-1', 'view-2'])
+    assert index.views_of('job-03') == frozenset(['all', 'view-0', 'view-2'])
+    assert index.views_of('job-01') == frozenset(['all'])
+    assert index.refresh() == set()
+
+def test_nested_requests_in_streams(fake):
+    from jenkins import RateLimit
+
+    limit = RateLimit(max_in_flight=1)
+    with Jenkins(fake.url, rate_limits={'json': limit, 'console': limit}) as j:
+        assert all(job.enabled for job in j.xjobs)
+        build = j.build('job-00', 5)
+        assert [build.building for line in build.iter_console(follow=False)]
+        assert limit.stats['in_flight'] == 0
+
+def test_crumb(fake, j):
+    j.job_disable('job-01')
+    fake.rotate_crumb()
+    j.job_enable('job-01')
+    assert [i for i in fake.requests if i[0] == 'POST'] == [
+        ('POST', '/job/job-01/disable'),
+        ('POST', '/job/job-01/enable'),
+        ('POST', '/job/job-01/enable'),
+    ]
+
+def test_build_and_console(fake, j):
+    fake.build_duration = 0.2
+    item = j.job_build('job-02')
+    assert item.id == 1
+
+    build = item.wait_until_started(tick=0.05, timeout=5)
+    assert build == j.job_last_build('job-02')
+    assert build.number == 6
+    assert build.building
+    assert build.wait(tick=0.05, timeout=5) == 'SUCCESS'
+    assert list(build.iter_console())[-1].rstrip() == 'Finished: SUCCESS'
+
+def test_nodes(fake, j):
+    j.node_create('agent', '/tmp/agent', num_executors=2)
+    assert j.node_exists('agent')
+    assert '<numExecutors>2</numExecutors>' in j.node_config('agent')
+    j.node_delete('agent')
+    assert not j.node_exists('agent')
+
+def test_latency_and_scale():
+    with FakeJenkins(latency=lambda req: 0.05 if 'api/json' in req.path else 0) as fake:
+        fake.populate(jobs=20000, builds=20)
+        j = Jenkins(fake.url)
+        assert len(j.jobnames) == 20000
+        assert j.job_last_build('job-19999').number == 20
+
+def test_queue(fake, j):
+    fake.queue_delay = 0.3
+    items = [j.job_build(name) for name in ('job-00', 'job-01', 'job-02')]
+    assert j.job_build('job-00') == items[0]
+    assert items[1].build is None
+    assert [i.result for i in j.queue_resolve(items)] == [None, None, None]
+
+    items[2].cancel()
+    assert items[0].wait_until_started(tick=0.05, timeout=5) == j.build('job-00', 6)
+
+    # Cancelled and unknown items are reported without failing the others.
+    results = j.queue_resolve(items + [j.queue_item('job-00', 12345)])
+    assert [i.item for i in results] == items + [j.queue_item('job-00', 12345)]
+    assert results[0].result == j.build('job-00', 6)
+    assert isinstance(results[2].error, JenkinsError)
+    assert not results[3].ok
+
+    fake.reset_stats()
+    results = j.queue_resolve(items[:2])
+    assert [i.result for i in results] == [j.build('job-00', 6), j.build('job-01', 6)]
+    assert len(fake.requests) == 3
+
+def test_folders():
+    with FakeJenkins() as fake:
+        fake.add_job('top')
+        fake.add_job('a/one', builds=2)
+        fake.add_job('a/b/two')
+        fake.add_job('a/b/c/d/three')
+        fake.folder('empty')
+        j = Jenkins(fake.url)
+
+        assert j.job('a/b/two').baseurl == 'job/a/job/b/job/two'
+        assert j.job_exists('a/b/two')
+        assert j.job_last_build('a/one').number == 2
+
+        fake.reset_stats()
+        names = set(i.name for i in j.walk_jobs())
+        assert names == set(['top', 'a/one', 'a/b/two', 'a/b/c/d/three'])
+        assert len(fake.requests) == 2
+
+        fake.reset_stats()
+        assert set(i.name for i in j.walk_jobs(levels=1)) == names
+        assert len(fake.requests) == 6
+
+        assert set(i.name for i in j.walk_jobs(max_depth=0)) == set(['top'])
+        assert set(i.name for i in j.walk_jobs(max_depth=1)) == set(['top', 'a/one'])
+        assert set(i.name for i in j.walk_jobs(max_depth=2, levels=1)) == set(['top', 'a/one', 'a/b/two'])
+
+        config = fake.items['top'].config
+        j.job_create('a/b/new', config)
+        assert fake.find_item('a/b/new') is not None
+        j.job_copy('top', 'a/copy')
+        j.job_copy('a/b/new', 'copy')
+        assert fake.find_item('a/copy').config == fake.find_item('copy').config
+
+        j.job_delete('a/b/new')
+        assert not j.job_exists('a/b/new')
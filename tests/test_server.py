@@ -0,0 +1,957 @@
+# -*- coding: utf-8; -*-
+
+import json
+import pytest
+
+# local imports
+from jenkins import Server, JenkinsError, config_digest
+
+# third-party imports
+from requests import HTTPError
+from requests.compat import unquote
+from httmock import all_requests, HTTMock
+
+
+#-----------------------------------------------------------------------------
+@all_requests
+def ok_json(url, request):
+    return {'status_code': 200, 'content': b'{"jobs": []}',
+            'headers': {'content-type': 'application/json'}}
+
+
+#-----------------------------------------------------------------------------
+def test_server_pool_config():
+    server = Server('http://localhost:8080', pool_connections=2, pool_maxsize=16, pool_block=True)
+    adapter = server.session.get_adapter('http://localhost:8080/')
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 16
+    assert adapter._pool_block is True
+
+    # The replaced adapter is closed.
+    closed = []
+    adapter.close = lambda: closed.append(adapter)
+    server.resize_pool(32)
+    assert server.session.get_adapter('http://localhost:8080/')._pool_maxsize == 32
+    assert closed == [adapter]
+    assert server.session.headers['Connection'] == 'keep-alive'
+
+def test_server_no_keep_alive():
+    server = Server('http://localhost:8080', keep_alive=False)
+    assert server.session.headers['Connection'] == 'close'
+
+def test_server_session_reuse():
+    server = Server('http://localhost:8080')
+    server.crumb_header = None
+    session = server.session
+    with HTTMock(ok_json):
+        assert server.json('api/json') == {'jobs': []}
+        server.get('api/json')
+        server.post('job/a/build')
+    assert server.session is session
+
+def test_server_context_manager(monkeypatch):
+    closed = []
+    with Server('http://localhost:8080') as server:
+        monkeypatch.setattr(server.session, 'close', lambda: closed.append(True))
+    assert closed == [True]
+
+def test_server_json_errors():
+    @all_requests
+    def not_json(url, request):
+        return {'status_code': 200, 'content': b'<html/>'}
+
+    @all_requests
+    def not_found(url, request):
+        return {'status_code': 404, 'content': b''}
+
+    server = Server('http://localhost:8080')
+    with HTTMock(not_json):
+        with pytest.raises(JenkinsError):
+            server.json('api/json')
+    with HTTMock(not_found):
+        with pytest.raises(HTTPError):
+            server.json('api/json')
+
+
+#-----------------------------------------------------------------------------
+class CrumbIssuer(object):
+    '''Mock Jenkins that issues a new crumb per request and can forget them.'''
+
+    def __init__(self):
+        self.issued = 0
+        self.valid = None
+        self.posts = []
+
+    def __call__(self, url, request):
+        if url.path.endswith('crumbIssuer/api/json'):
+            self.issued += 1
+            self.valid = 'crumb-%d' % self.issued
+            body = '{"crumbRequestField": "Jenkins-Crumb", "crumb": "%s"}' % self.valid
+            return {'status_code': 200, 'content': body.encode('utf8')}
+
+        self.posts.append(request.headers.get('Jenkins-Crumb'))
+        if request.headers.get('Jenkins-Crumb') != self.valid:
+            return {'status_code': 403, 'content': b'No valid crumb was included in the request'}
+        return {'status_code': 200, 'content': b''}
+
+
+def test_crumb_lazy():
+    from jenkins import Jenkins
+
+    issuer = CrumbIssuer()
+    with HTTMock(all_requests(issuer)):
+        api = Jenkins('http://localhost:8080')
+        assert issuer.issued == 0
+
+        api.server.post('job/a/build')
+        api.server.post('job/b/build')
+        assert issuer.issued == 1
+        assert issuer.posts == ['crumb-1', 'crumb-1']
+
+def test_crumb_refresh_on_403():
+    issuer = CrumbIssuer()
+    server = Server('http://localhost:8080')
+    with HTTMock(all_requests(issuer)):
+        server.post('job/a/build')
+
+        # Simulate a Jenkins restart.
+        issuer.valid = None
+        server.post('job/a/build')
+
+    assert issuer.issued == 2
+    assert issuer.posts == ['crumb-1', 'crumb-1', 'crumb-2']
+
+def test_crumb_missing():
+    @all_requests
+    def no_crumb_issuer(url, request):
+        if url.path.endswith('crumbIssuer/api/json'):
+            return {'status_code': 404, 'content': b''}
+        assert 'Jenkins-Crumb' not in request.headers
+        return {'status_code': 200, 'content': b''}
+
+    server = Server('http://localhost:8080')
+    with HTTMock(no_crumb_issuer):
+        server.post('job/a/build')
+    assert server.crumb_header is None
+
+
+#-----------------------------------------------------------------------------
+def test_json_tree():
+    from jenkins import Jenkins
+
+    queries = []
+
+    @all_requests
+    def response(url, request):
+        queries.append((url.path, url.query))
+        body = b'{"jobs": [{"name": "a"}], "views": [], "builds": [{"number": 1}]}'
+        return {'status_code': 200, 'content': body}
+
+    api = Jenkins('http://localhost:8080')
+    with HTTMock(response):
+        assert api.jobnames == ['a']
+        assert api.job('a').buildnumbers == [1]
+        assert api.view('v').jobnames == ['a']
+        assert api.job('a').exists
+
+    assert queries == [
+        ('/api/json', 'tree=jobs%5Bname%5D'),
+        ('/job/a/api/json', 'depth=0&tree=builds%5Bnumber%5D'),
+        ('/view/v/api/json', 'depth=0&tree=jobs%5Bname%5D'),
+        ('/job/a/api/json', 'depth=0&tree=name'),
+    ]
+
+
+#-----------------------------------------------------------------------------
+def test_job_summaries():
+    from jenkins import Jenkins, JobSummary
+
+    queries = []
+
+    @all_requests
+    def response(url, request):
+        queries.append(url.query)
+        body = b'''{"jobs": [
+            {"name": "a", "color": "blue", "buildable": true,
+             "lastBuild": {"number": 3, "result": "SUCCESS", "timestamp": 10, "duration": 5}},
+            {"name": "b", "color": "disabled", "buildable": false, "lastBuild": null}
+        ]}'''
+        return {'status_code': 200, 'content': body}
+
+    api = Jenkins('http://localhost:8080')
+    with HTTMock(response):
+        a, b = api.job_summaries()
+        api.job_summaries(fields=['color'])
+
+    assert a == JobSummary('a', 'blue', True, 3, 'SUCCESS', 10, 5)
+    assert b == JobSummary('b', 'disabled', False, None, None, None, None)
+    assert not hasattr(a, '__dict__')
+    assert len(queries) == 2
+
+    assert JobSummary.tree(['color']) == 'jobs[name,color]'
+    assert JobSummary.tree(['last_build', 'last_result']) == 'jobs[name,lastBuild[number,result]]'
+    with pytest.raises(JenkinsError):
+        JobSummary.tree(['nope'])
+
+
+#-----------------------------------------------------------------------------
+def test_batch_map():
+    from jenkins import Jenkins
+
+    @all_requests
+    def response(url, request):
+        if url.path.endswith('crumbIssuer/api/json'):
+            return {'status_code': 404, 'content': b''}
+        if url.path.startswith('/job/missing'):
+            return {'status_code': 404, 'content': b''}
+        return {'status_code': 200, 'content': b'{"name": "x"}'}
+
+    api = Jenkins('http://localhost:8080', pool_maxsize=4)
+    names = ['job-%d' % i for i in range(20)] + ['missing']
+
+    with HTTMock(response):
+        batch = api.batch(max_workers=8)
+        results = batch.map('job_disable', names)
+        assert batch.max_workers == 4
+        assert api.server.pool_maxsize == 4
+
+        assert [r.item for r in results] == names
+        assert all(r.ok for r in results[:-1])
+        assert isinstance(results[-1].error, JenkinsError)
+
+        results = api.batch().map(lambda a, b: a + b, [(1, 2), (3, 4)])
+        assert [r.result for r in results] == [3, 7]
+
+
+#-----------------------------------------------------------------------------
+def test_optimistic_mutations():
+    from jenkins import Jenkins
+
+    requests = []
+
+    @all_requests
+    def response(url, request):
+        requests.append((request.method, url.path))
+        if url.path.endswith('crumbIssuer/api/json'):
+            return {'status_code': 404, 'content': b''}
+        if url.path.startswith('/job/missing'):
+            return {'status_code': 404, 'content': b''}
+        if url.path == '/view/v/addJobToView' and 'missing' in url.query:
+            return {'status_code': 400, 'content': b''}
+        return {'status_code': 200, 'content': b'{"name": "a"}'}
+
+    api = Jenkins('http://localhost:8080', optimistic=True)
+    with HTTMock(response):
+        api.job_enable('a')
+        api.job_delete('a')
+        api.view_add_job('v', 'a')
+        with pytest.raises(JenkinsError):
+            api.job_disable('missing')
+        with pytest.raises(JenkinsError):
+            api.view_add_job('v', 'missing')
+
+    assert [m for m, path in requests if m == 'GET' and 'crumbIssuer' not in path] == []
+
+    # The default is to check existence first, which can be overridden per call.
+    api = Jenkins('http://localhost:8080')
+    del requests[:]
+    with HTTMock(response):
+        api.job_enable('a')
+        assert [m for m, path in requests] == ['GET', 'GET', 'POST']
+
+        del requests[:]
+        api.job_enable('a', optimistic=True)
+        assert [m for m, path in requests] == ['POST']
+
+
+#-----------------------------------------------------------------------------
+def test_job_enabled():
+    from jenkins import Jenkins
+
+    queries = []
+
+    @all_requests
+    def response(url, request):
+        queries.append((url.path, url.query))
+        if url.path == '/api/json':
+            body = b'''{"jobs": [
+                {"name": "a", "color": "blue", "buildable": true},
+                {"name": "b", "color": "disabled", "buildable": false},
+                {"name": "c", "disabled": true},
+                {"name": "d", "buildable": false}
+            ]}'''
+        else:
+            body = b'{"color": "disabled", "buildable": false}'
+        return {'status_code': 200, 'content': body}
+
+    api = Jenkins('http://localhost:8080')
+    with HTTMock(response):
+        assert api.job_enabled('a') is False
+        assert api.jobs_enabled() == {'a': True, 'b': False, 'c': False, 'd': False}
+
+    assert queries == [
+        ('/job/a/api/json', 'depth=0&tree=disabled%2Ccolor%2Cbuildable'),
+        ('/api/json', 'tree=jobs%5Bname%2Cdisabled%2Ccolor%2Cbuildable%5D'),
+    ]
+
+
+#-----------------------------------------------------------------------------
+def test_build_wait(monkeypatch):
+    import time
+    from jenkins import Jenkins
+
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+
+    polls = []
+    started = int(time.time() * 1000)
+
+    @all_requests
+    def response(url, request):
+        polls.append(url.query)
+        building = len(polls) < 5
+        body = {'building': building, 'result': None if building else 'FAILURE',
+                'timestamp': started, 'estimatedDuration': 20000}
+        return {'status_code': 200, 'content': json.dumps(body).encode('utf8')}
+
+    api = Jenkins('http://localhost:8080')
+    with HTTMock(response):
+        assert api.build_wait('a', 1, interval=1) == 'FAILURE'
+
+    assert polls[0] == 'depth=0&tree=building%2Cresult%2Ctimestamp%2CestimatedDuration'
+    assert len(sleeps) == 4
+
+    # The first poll sleeps through most of the estimated 20 seconds.
+    assert 15 < sleeps[0] < 23
+    assert all(0 <= i < 23 for i in sleeps)
+
+def test_build_wait_timeout(monkeypatch):
+    import time
+    from jenkins import Jenkins, _PollSchedule
+
+    @all_requests
+    def response(url, request):
+        return {'status_code': 200, 'content': b'{"building": true, "result": null}'}
+
+    api = Jenkins('http://localhost:8080')
+    with HTTMock(response):
+        start = time.time()
+        assert api.build_wait('a', 1, interval=0.05, timeout=0.2) is None
+        assert 0.2 <= time.time() - start < 0.4
+
+    # Without an estimate the interval backs off up to max_tick.
+    schedule = _PollSchedule(tick=1, max_tick=4, backoff=2, jitter=0)
+    assert [schedule.next({}) for i in range(5)] == [1, 2, 4, 4, 4]
+
+
+#-----------------------------------------------------------------------------
+def test_build_iter_console(monkeypatch):
+    import time
+    from jenkins import Jenkins
+
+    monkeypatch.setattr(time, 'sleep', lambda delay: None)
+
+    log = u'line 1\r\nline 2\nпроба\nlast'.encode('utf8')
+    offsets = []
+
+    @all_requests
+    def response(url, request):
+        start = int(url.query.split('=')[1])
+        offsets.append(start)
+
+        # Serve the log in pieces that end in the middle of a line and character.
+        end = min(start + 10, len(log))
+        headers = {'X-Text-Size': str(end)}
+        if end < len(log):
+            headers['X-More-Data'] = 'true'
+        return {'status_code': 200, 'content': log[start:end], 'headers': headers}
+
+    api = Jenkins('http://localhost:8080')
+    with HTTMock(response):
+        lines = list(api.build_iter_console('a', 1))
+        assert lines == [u'line 1', u'line 2', u'проба', u'last']
+        assert offsets == [0, 10, 20]
+
+        del offsets[:]
+        assert list(api.build_iter_console('a', 1, follow=False)) == [u'line 1', u'li']
+        assert offsets == [0]
+
+
+#-----------------------------------------------------------------------------
+def test_job_iter_builds():
+    import re
+    from jenkins import Jenkins, Build
+
+    numbers = list(range(250, 0, -1))
+    ranges = []
+
+    @all_requests
+    def response(url, request):
+        tree = unquote(url.query)
+        m = re.search(r'\{(\d+),(\d+)\}', tree)
+        start, end = int(m.group(1)), int(m.group(2))
+        ranges.append((start, end))
+        builds = [{'number': i, 'result': 'SUCCESS'} for i in numbers[start:end]]
+        return {'status_code': 200, 'content': json.dumps({'allBuilds': builds}).encode('utf8')}
+
+    api = Jenkins('http://localhost:8080')
+    with HTTMock(response):
+        builds = list(api.job_iter_builds('a', page_size=100))
+        assert [i.number for i in builds] == numbers
+        assert builds[0] == Build(api.job('a'), 250)
+        assert ranges == [(0, 100), (100, 200), (200, 300)]
+
+        # Pages are only fetched as they are consumed.
+        del ranges[:]
+        builds = api.job('a').iter_builds(start=10, page_size=5, fields=['result'])
+        build, info = next(builds)
+        assert (build.number, info['result']) == (240, 'SUCCESS')
+        assert ranges == [(10, 15)]
+
+
+#-----------------------------------------------------------------------------
+def test_build_pointers():
+    from jenkins import Jenkins, Build
+
+    queries = []
+
+    @all_requests
+    def response(url, request):
+        queries.append(unquote(url.query))
+        job = {'lastBuild': {'number': 5, 'result': 'FAILURE'},
+               'lastStableBuild': {'number': 3, 'result': 'SUCCESS'},
+               'lastSuccessfulBuild': {'number': 4, 'result': 'UNSTABLE'},
+               'lastFailedBuild': None}
+        body = {'jobs': [dict(job, name='a')]} if url.path == '/api/json' else job
+        return {'status_code': 200, 'content': json.dumps(body).encode('utf8')}
+
+    api = Jenkins('http://localhost:8080')
+    job = api.job('a')
+    with HTTMock(response):
+        pointers = api.job_build_pointers('a')
+        assert pointers == {
+            'last_build': Build(job, 5),
+            'last_stable_build': Build(job, 3),
+            'last_successful_build': Build(job, 4),
+            'last_failed_build': None,
+        }
+
+        pointers = api.jobs_build_pointers(fields=['result'])
+        assert pointers['a']['last_build'] == (Build(job, 5), {'number': 5, 'result': 'FAILURE'})
+
+    assert queries == [
+        'depth=0&tree=lastBuild[number],lastStableBuild[number],'
+        'lastSuccessfulBuild[number],lastFailedBuild[number]',
+        'tree=jobs[name,lastBuild[number,result],lastStableBuild[number,result],'
+        'lastSuccessfulBuild[number,result],lastFailedBuild[number,result]]',
+    ]
+
+
+#-----------------------------------------------------------------------------
+def test_response_cache():
+    from jenkins import Jenkins
+
+    config = b'<?xml version="1.0"?><project><disabled>false</disabled></project>'
+    etags = {'a': '"1"', 'b': '"2"', 'c': '"4"'}
+    sent = []
+
+    @all_requests
+    def response(url, request):
+        name = url.path.split('/')[2]
+        sent.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == etags[name]:
+            return {'status_code': 304, 'content': b''}
+        headers = {'ETag': etags[name], 'Content-Type': 'application/xml'}
+        return {'status_code': 200, 'content': config, 'headers': headers}
+
+    api = Jenkins('http://localhost:8080', response_cache_size=len(config) * 2)
+    cache = api.server.response_cache
+    with HTTMock(response):
+        assert api.job_config('a') == config.decode('utf8')
+        assert api.job_config('a') == config.decode('utf8')
+        assert sent == [None, '"1"']
+        assert cache.stats['hits'] == 1
+
+        # A changed config is downloaded again.
+        etags['a'] = '"3"'
+        api.job_config('a')
+        assert sent[-1] == '"1"'
+        assert cache.stats == {'hits': 1, 'misses': 2, 'revalidations': 2, 'entries': 1, 'bytes': len(config)}
+
+        # The least recently used entry is evicted.
+        api.job_config('b')
+        api.job_config('a')
+        api.job_config('c')
+        assert [key[0] for key in cache.entries] == [
+            'http://localhost:8080/job/a/config.xml',
+            'http://localhost:8080/job/c/config.xml',
+        ]
+
+
+#-----------------------------------------------------------------------------
+def test_info_cache():
+    from jenkins import Jenkins
+
+    requests = []
+
+    @all_requests
+    def response(url, request):
+        requests.append((request.method, url.path))
+        if url.path.endswith('crumbIssuer/api/json'):
+            return {'status_code': 404, 'content': b''}
+        body = b'{"name": "a", "builds": [{"number": 1}], "jobs": [{"name": "a"}]}'
+        return {'status_code': 200, 'content': body}
+
+    api = Jenkins('http://localhost:8080', info_cache_ttl=60)
+    job = api.job('a')
+    with HTTMock(response):
+        job.info['builds'].append('garbage')
+        assert job.info['builds'] == [{'number': 1}]
+        assert job.exists and job.exists
+        assert job.buildnumbers == job.buildnumbers == [1]
+        assert api.jobnames == ['a']
+        assert len(requests) == 4
+
+        # Mutations invalidate the object and the listings that contain it.
+        del requests[:]
+        job.disable()
+        assert requests == [('GET', '/crumbIssuer/api/json'), ('POST', '/job/a/disable')]
+        job.buildnumbers
+        api.jobnames
+        assert len(requests) == 4
+
+        # So do the listings of the folder that contains a job.
+        del requests[:]
+        folder = api.job('f')
+        folder.get_info(tree='jobs[name]')
+        api.job('f/a').disable()
+        folder.get_info(tree='jobs[name]')
+        assert requests.count(('GET', '/job/f/api/json')) == 2
+
+        # Other objects stay cached until explicitly invalidated.
+        del requests[:]
+        api.view('v').jobnames
+        api.view('v').jobnames
+        assert len(requests) == 1
+        api.invalidate()
+        api.view('v').jobnames
+        assert len(requests) == 2
+
+
+def test_config_cache():
+    from jenkins import Jenkins
+
+    requests = []
+    config = {'jobs': ['a', 'b']}
+
+    @all_requests
+    def response(url, request):
+        requests.append((request.method, url.path))
+        if url.path.endswith('crumbIssuer/api/json'):
+            return {'status_code': 404, 'content': b''}
+        if request.method == 'POST':
+            config['jobs'].append(request.url.split('name=')[1])
+            return {'status_code': 200, 'content': b''}
+        jobs = ''.join('<string>%s</string>' % i for i in config['jobs'])
+        body = '<hudson.model.ListView><jobNames>%s</jobNames></hudson.model.ListView>' % jobs
+        return {'status_code': 200, 'content': body.encode('utf8'),
+                'headers': {'Content-Type': 'application/xml'}}
+
+    api = Jenkins('http://localhost:8080', config_cache_size=16)
+    cache = api.server.config_cache
+    view = api.view('v')
+    with HTTMock(response):
+        # Configs are downloaded on every access, but parsed only once.
+        assert all(name in view for name in ('a', 'b'))
+        assert 'c' not in view
+        assert len(requests) == 3
+        assert cache.stats == {'hits': 0, 'misses': 1, 'revalidations': 2, 'entries': 1}
+
+        # Callers cannot modify the cached document.
+        view.config_etree.find('jobNames').clear()
+        assert len(view.config_etree.xpath('jobNames/string')) == 2
+
+    api = Jenkins('http://localhost:8080', config_cache_size=16, config_cache_ttl=60)
+    view = api.view('v')
+    with HTTMock(response):
+        del requests[:]
+        assert sum(1 for i in range(100) if 'a' in view) == 100
+        assert requests == [('GET', '/view/v/config.xml')]
+
+        # Mutations invalidate the cached config.
+        view.add_job(api.job('c'), optimistic=True)
+        assert 'c' in view
+
+    # The cache is disabled by default.
+    assert Jenkins('http://localhost:8080').server.config_cache is None
+
+
+#-----------------------------------------------------------------------------
+def test_retry(monkeypatch):
+    import time
+    from requests import ConnectionError
+    from jenkins import RetryPolicy
+
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+
+    responses = []
+
+    @all_requests
+    def response(url, request):
+        item = responses.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    retry = RetryPolicy(total=3, backoff=1, jitter=0)
+    server = Server('http://localhost:8080', retry=retry)
+    server.crumb_header = None
+
+    with HTTMock(response):
+        responses[:] = [ConnectionError(), {'status_code': 503, 'headers': {'Retry-After': '7'}},
+                        {'status_code': 200, 'content': b'{}'}]
+        assert server.json('api/json') == {}
+        assert sleeps == [1, 7]
+
+        # Retries are limited and Retry-After beyond max_backoff is not waited for.
+        responses[:] = [{'status_code': 503}] * 5
+        with pytest.raises(HTTPError):
+            server.get('api/json')
+        assert len(responses) == 1
+
+        responses[:] = [{'status_code': 503, 'headers': {'Retry-After': '3600'}}]
+        assert server.get('api/json', throw=False).status_code == 503
+
+        # POST requests are retried only if they are marked idempotent.
+        responses[:] = [{'status_code': 503}, {'status_code': 200}]
+        with pytest.raises(HTTPError):
+            server.post('job/a/build')
+
+        responses[:] = [{'status_code': 503}, {'status_code': 200}]
+        server.post('job/a/disable', idempotent=True)
+        assert responses == []
+
+def test_circuit_breaker(monkeypatch):
+    from requests import ConnectionError
+    from jenkins import CircuitBreaker, CircuitOpenError
+
+    calls = []
+
+    @all_requests
+    def response(url, request):
+        calls.append(url.path)
+        if len(calls) <= 3:
+            raise ConnectionError()
+        return {'status_code': 200, 'content': b'{}'}
+
+    now = [0]
+    monkeypatch.setattr('jenkins._monotonic', lambda: now[0])
+
+    breaker = CircuitBreaker(threshold=3, reset_timeout=10)
+    server = Server('http://localhost:8080', circuit_breaker=breaker)
+    with HTTMock(response):
+        for i in range(3):
+            with pytest.raises(ConnectionError):
+                server.get('api/json')
+
+        assert breaker.state == 'open'
+        with pytest.raises(CircuitOpenError):
+            server.get('api/json')
+        assert len(calls) == 3
+
+        now[0] = 11
+        assert breaker.state == 'half-open'
+        server.get('api/json')
+        assert breaker.state == 'closed'
+
+def test_circuit_breaker_trial_errors(monkeypatch):
+    from requests.exceptions import ChunkedEncodingError
+    from jenkins import CircuitBreaker, CircuitOpenError
+
+    errors = [ChunkedEncodingError()]
+
+    @all_requests
+    def response(url, request):
+        if errors:
+            raise errors.pop()
+        return {'status_code': 200, 'content': b'{}'}
+
+    now = [0]
+    monkeypatch.setattr('jenkins._monotonic', lambda: now[0])
+
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10)
+    breaker.record(False)
+    server = Server('http://localhost:8080', circuit_breaker=breaker)
+    with HTTMock(response):
+        # A failed trial request opens the circuit again, whatever the error.
+        now[0] = 11
+        with pytest.raises(ChunkedEncodingError):
+            server.get('api/json')
+        assert breaker.state == 'open'
+        with pytest.raises(CircuitOpenError):
+            server.get('api/json')
+
+        now[0] = 22
+        server.get('api/json')
+        assert breaker.state == 'closed'
+
+    with pytest.raises(TypeError):
+        Server('http://localhost:8080', retry=True)
+
+def test_circuit_breaker_exists(monkeypatch):
+    from jenkins import Jenkins, CircuitBreaker, CircuitOpenError
+
+    monkeypatch.setattr('jenkins._monotonic', lambda: 0)
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10)
+    breaker.record(False)
+
+    # An open circuit says nothing about whether objects exist.
+    api = Jenkins('http://localhost:8080', circuit_breaker=breaker)
+    with pytest.raises(CircuitOpenError):
+        api.job_exists('job-0')
+    with pytest.raises(CircuitOpenError):
+        api.job_delete('job-0')
+    with pytest.raises(CircuitOpenError):
+        api.server.fetch_crumb()
+
+def test_request_metrics():
+    from jenkins import RequestMetrics, RetryPolicy, prometheus_text
+
+    assert RequestMetrics.template('job/a b/12/api/json?tree=x') == 'job/{name}/{number}/api/json'
+    assert RequestMetrics.template('view/all/job/x/api/json') == 'view/{name}/job/{name}/api/json'
+    assert RequestMetrics.template('computer/api/json') == 'computer/api/json'
+    assert RequestMetrics.template('createItem') == 'createItem'
+    assert RequestMetrics.template('job/2024/7/') == 'job/{name}/{number}'
+
+    responses = []
+
+    @all_requests
+    def response(url, request):
+        return responses.pop(0)
+
+    server = Server('http://localhost:8080', retry=RetryPolicy(backoff=0))
+    assert server.metrics is None
+
+    server = Server('http://localhost:8080', metrics=True, retry=RetryPolicy(backoff=0))
+    server.crumb_header = None
+    with HTTMock(response):
+        responses[:] = [{'status_code': 503}, {'status_code': 200, 'content': b'{"a": 1}'}]
+        server.json('job/a/api/json')
+        responses[:] = [{'status_code': 200, 'content': b'{"b": 22}'}]
+        server.json('job/b/api/json')
+        responses[:] = [{'status_code': 404}]
+        server.post('job/c/build', throw=False)
+
+    snapshot = server.metrics.snapshot()
+    assert sorted(snapshot) == [('GET', 'job/{name}/api/json'), ('POST', 'job/{name}/build')]
+
+    endpoint = snapshot[('GET', 'job/{name}/api/json')]
+    assert endpoint['count'] == 3
+    assert endpoint['retries'] == 1
+    assert endpoint['statuses'] == {200: 2, 503: 1}
+    assert endpoint['bytes'] == len(b'{"a": 1}') + len(b'{"b": 22}')
+    assert sum(endpoint['latency_buckets']) == 3
+    assert snapshot[('POST', 'job/{name}/build')]['statuses'] == {404: 1}
+
+    text = prometheus_text(server.metrics)
+    labels = 'method="GET",endpoint="job/{name}/api/json"'
+    assert 'jenkins_webapi_requests_total{%s,status="200"} 2' % labels in text
+    assert 'jenkins_webapi_retries_total{%s} 1' % labels in text
+    assert 'jenkins_webapi_request_duration_seconds_bucket{%s,le="+Inf"} 3' % labels in text
+    labels = 'method="POST",endpoint="job/{name}/build"'
+    assert 'jenkins_webapi_request_duration_seconds_count{%s} 1' % labels in text
+
+    server.metrics.reset()
+    assert server.metrics.snapshot() == {}
+
+def test_request_metrics_streams():
+    from jenkins import Jenkins
+
+    body = json.dumps({'jobs': [{'name': 'job-%d' % i} for i in range(1000)]}).encode('utf8')
+
+    @all_requests
+    def response(url, request):
+        return {'status_code': 200, 'content': body}
+
+    # Streamed bodies are counted as they are read, without a Content-Length.
+    j = Jenkins('http://localhost:8080', metrics=True)
+    with HTTMock(response):
+        assert len(list(j.xjobs)) == 1000
+    assert j.server.metrics.snapshot()[('GET', 'api/json')]['bytes'] == len(body)
+
+def test_json_array_reader():
+    from jenkins import _JsonArrayReader
+
+    doc = {
+        'description': 'not "jobs": [1, 2]',
+        'nested': {'jobs': [{'x': 1}]},
+        'jobs': [{'name': 'a', 'n': 12345}, {'name': u'б', 'builds': [1, 2.5e3]}, 678],
+        'trailing': [None, True],
+    }
+    text = json.dumps(doc)
+    for size in (1, 3, 7, len(text)):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert list(_JsonArrayReader(chunks).items('jobs')) == doc['jobs']
+        assert list(_JsonArrayReader(chunks).items('missing')) == []
+
+    assert list(_JsonArrayReader(['{"jobs": []}']).items('jobs')) == []
+    assert list(_JsonArrayReader(['{}']).items('jobs')) == []
+    with pytest.raises(JenkinsError):
+        list(_JsonArrayReader(['{"jobs": [1, 2']).items('jobs'))
+
+def test_json_array_reader_large_values():
+    import time
+    from jenkins import _JsonArrayReader
+
+    skipped = [{'name': 'view-%d' % i, 'description': 'a "quoted" \\ [value] {%d}' % i} for i in range(50000)]
+    big = {'name': 'big', 'description': 'x' * 200000, 'builds': list(range(1000))}
+    head = json.dumps({'views': skipped, 'jobs': [big, 'small']})[:-1]
+    text = head + ', "trailing": ' + json.dumps(skipped) + '}'
+    assert len(text) > 4 * 1024 * 1024
+
+    consumed = []
+    def chunks(size):
+        for i in range(0, len(text), size):
+            consumed.append(i + size)
+            yield text[i:i + size]
+
+    start = time.time()
+    assert list(_JsonArrayReader(chunks(65536)).items('jobs')) == [big, 'small']
+    assert time.time() - start < 5
+
+    # The rest of the document is not read once the array has ended.
+    assert consumed[-1] < len(head) + 65536
+
+def test_iter_json():
+    from jenkins import Jenkins
+
+    @all_requests
+    def response(url, request):
+        assert 'tree=jobs%5Bname%5D' in url.query
+        body = {'jobs': [{'name': 'job-%d' % i} for i in range(100)]}
+        return {'status_code': 200, 'content': json.dumps(body).encode('utf8')}
+
+    j = Jenkins('http://localhost:8080')
+    with HTTMock(response):
+        assert [i.name for i in j.xjobs] == ['job-%d' % i for i in range(100)]
+
+def test_iter_json_memory():
+    import tracemalloc
+    from jenkins import Jenkins
+
+    jobs = [{'name': 'job-%d' % i, 'color': 'blue', 'lastBuild': {'number': i, 'result': 'SUCCESS'}}
+            for i in range(20000)]
+    body = json.dumps({'jobs': jobs}).encode('utf8')
+    del jobs
+
+    @all_requests
+    def response(url, request):
+        return {'status_code': 200, 'content': body}
+
+    j = Jenkins('http://localhost:8080')
+    with HTTMock(response):
+        tracemalloc.start()
+        try:
+            count = sum(1 for i in j.xjob_summaries())
+            streamed = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            count_all = len(j.job_summaries())
+            buffered = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert count == count_all == 20000
+    assert streamed * 10 < buffered
+
+def test_rate_limit():
+    import time
+    import threading
+    from jenkins import RateLimit
+
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    @all_requests
+    def response(url, request):
+        if request.method == 'POST':
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+        return {'status_code': 200, 'content': b'{}'}
+
+    reads = RateLimit(rate=20, burst=2)
+    writes = RateLimit(max_in_flight=2)
+    server = Server('http://localhost:8080', metrics=True,
+                    rate_limits={'GET json': reads, 'POST': writes})
+    server.crumb_header = None
+
+    assert server.rate_limit('GET', 'http://localhost:8080/job/a/api/json?tree=x') is reads
+    assert server.rate_limit('POST', 'http://localhost:8080/job/a/build') is writes
+    assert server.rate_limit('GET', 'http://localhost:8080/job/a/config.xml') is None
+
+    with HTTMock(response):
+        start = time.time()
+        for i in range(6):
+            server.json('api/json')
+        # Two requests fit in the burst, the rest are sent at 20 per second.
+        assert time.time() - start >= 0.9 * 4 / 20.0
+        assert reads.stats['requests'] == 6
+        assert reads.stats['waits'] == 4
+        assert reads.stats['wait_time'] > 0
+
+        threads = [threading.Thread(target=server.post, args=('job/a/build',)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak[0] == 2
+        assert writes.stats['in_flight'] == 0
+        assert writes.stats['max_wait'] > 0
+
+    snapshot = server.metrics.snapshot()
+    assert snapshot[('GET', 'api/json')]['throttle_waits'] == 4
+
+def test_rate_limit_streams():
+    from jenkins import RateLimit
+
+    @all_requests
+    def response(url, request):
+        if 'missing' in url.path:
+            return {'status_code': 404, 'content': b''}
+        return {'status_code': 200, 'content': b'{"jobs": [{"name": "a"}, {"name": "b"}]}'}
+
+    streams = RateLimit(max_in_flight=2)
+    server = Server('http://localhost:8080', rate_limits={'GET': streams})
+    with HTTMock(response):
+        # Streamed responses hold their slot until they are closed.
+        items = server.iter_json('api/json', 'jobs')
+        assert next(items) == {'name': 'a'}
+        assert streams.stats['in_flight'] == 1
+        items.close()
+        assert streams.stats['in_flight'] == 0
+
+        # Requests made while iterating over a stream do not wait for it.
+        for item in server.iter_json('api/json', 'jobs'):
+            assert server.json('job/%s/api/json' % item['name'])
+        assert streams.stats['in_flight'] == 0
+
+        list(server.iter_json('api/json', 'jobs'))
+        with pytest.raises(HTTPError):
+            server.get('job/missing/logText/progressiveText', stream=True)
+        assert streams.stats['in_flight'] == 0
+
+def test_config_digest():
+    config = '<project a="1" b="2">\n  <description>x y</description>\n  <builders/>\n</project>'
+    same = ("<?xml version='1.1' encoding='UTF-8'?>\n"
+            '<project b="2" a="1"><!-- comment -->'
+            '<description>x y</description><builders></builders></project>')
+    assert config_digest(config) == config_digest(same)
+    assert config_digest(config) == config_digest(config.encode('utf8'))
+
+    assert config_digest(config) != config_digest(config.replace('x y', 'x  y'))
+    assert config_digest(config) != config_digest(config.replace('<builders/>', '<builders> </builders>'))
+    assert config_digest(config) != config_digest(config.replace('a="1"', 'a="2"'))